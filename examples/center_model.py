@@ -3,6 +3,8 @@ import argparse
 
 import itertools as it
 
+import numpy as np
+
 from py3do import Mesh
 from py3do.io import read_stl, write_binary_stl
 from py3do.vis import view_pyglet
@@ -21,32 +23,28 @@ args = parser.parse_args()
 m = read_stl(args.stlfile, fix_nan_normals=True)
 
 # rotate
-for axis in args.rotate.upper():
-    ai = "XYZ".find(axis)
-    if ai < 0:
-        print("Error: argument to --rotate must be a string of XYZxyz")
-        parser.print_usage()
-        sys.exit(1)
-    a0 = 1 if ai == 0 else 0
-    a1 = 1 if ai == 2 else 2
-    m.vertices[:,(a0,a1)] = m.vertices[:,(a1,a0)]
-    m.vertices[:,a1] = -m.vertices[:,a1]
-# center
+if any(axis not in "XYZ" for axis in args.rotate.upper()):
+    print("Error: argument to --rotate must be a string of XYZxyz")
+    parser.print_usage()
+    sys.exit(1)
+m.rot90(args.rotate)
+# center and drop with a single translation
+T = np.eye(4)
 for axis in args.center.upper():
     ai = "XYZ".find(axis)
     if ai < 0:
         print("Error: argument to --center must be a string of XYZxyz")
         parser.print_usage()
         sys.exit(1)
-    m.vertices[:,ai] -= m.vertices[:,ai].mean()
-# drop
+    T[ai,3] = -m.vertices[:,ai].mean()
 for axis in args.drop.upper():
     ai = "XYZ".find(axis)
     if ai < 0:
         print("Error: argument to --drop must be a string of XYZxyz")
         parser.print_usage()
         sys.exit(1)
-    m.vertices[:,ai] -= m.vertices[:,ai].min()
+    T[ai,3] = -m.vertices[:,ai].min()
+m.transform(T)
 
 base_name = args.stlfile[:-4]
 out_fname = base_name + "_c.stl"
@@ -7,6 +7,7 @@ from py3do.topo import repeated_face_vertices
 from py3do.topo import unused_vertices
 from py3do.topo import EdgeToFaceMap
 from py3do import connected_components
+from py3do import repair_mesh
 
 t0 = time.time()
 m = read_mesh(sys.argv[1])
@@ -34,4 +35,10 @@ print(f"Model edges are {'' if efm.oriented else 'NOT '}correctly oriented")
 print(f"Model is {'' if efm.manifold else 'NOT '}manifold")
 print(f"Model is {'' if efm.watertight else 'NOT '}watertight")
 
+if not (efm.oriented and efm.manifold) or len(rep_vert) > 0:
+    m, report = repair_mesh(m)
+    print("\nRepaired model:")
+    for k, v in report.items():
+        print(f"  {k}: {v}")
+
 view_pyglet(m)
@@ -11,10 +11,22 @@ from .geom import vertex_normals
 from .geom import edge_lengths
 from .geom import volume
 from .geom import COG
+from .geom import affine_parts
+from .geom import transform_points
+from .geom import stream_volume
+from .geom import stream_COG
+from .geom import stream_extents
+from .geom import stream_surface_area
 from .topo import repeated_face_vertices
 from .topo import sorted_edges
 from .topo import EdgeToFaceMap
+from .topo import HalfEdgeMesh
 from .topo import connected_components
+from .topo import edge_loops
+from .topo import boundary_loops
+from .topo import vertex_face_adjacency
+from .topo import vertex_vertex_adjacency
+from .topo import face_face_adjacency
 from .primitives import cube
 from .primitives import circle
 from .primitives import cone_pipe
@@ -22,6 +34,12 @@ from .primitives import uv_sphere
 from .binary_relations import is_isomorphic
 from .mesh_ops import split_mesh
 from .mesh_ops import chamfer_bottom
+from .mesh_ops import fill_holes
+from .repair import remove_degenerate_faces
+from .repair import remove_duplicate_faces
+from .repair import split_nonmanifold
+from .repair import orient_faces
+from .repair import repair_mesh
 from .slice import slice_horiz_0
 from .shell import offset_mesh
 from . import vis
@@ -1,6 +1,7 @@
 """Binary relations between meshes."""
 
 import numpy as np
+from scipy.spatial import cKDTree
 
 def is_isomorphic(m1, m2, tol=0):
     """A simple test if two meshes are isomorphic.
@@ -24,7 +25,13 @@ def is_isomorphic(m1, m2, tol=0):
             vmap[i] = vertex_map_1[vt]
         vmap = np.array(vmap)
     else:
-        raise NotImplemented("is_isomorphic: nonzero tolerance not implemented")
+        d, vmap = cKDTree(m1.vertices).query(
+            m2.vertices, distance_upper_bound=np.nextafter(tol, np.inf))
+        if not np.isfinite(d).all():
+            return False
+        # the map must be one to one
+        if np.unique(vmap).shape[0] != vmap.shape[0]:
+            return False
     mapped_faces = vmap[m2.faces]
     # sort faces lexicographically
     i1 = np.lexsort(m1.faces.T)
@@ -2,7 +2,7 @@
 
 import numpy as np
 
-from .topo import sorted_edges
+from .utils import scatter_add
 
 def normals_cross(m):
     """Caclulate normals using cross products."""
@@ -18,7 +18,7 @@ def normals_cross(m):
 def normals_Newell(m):
     """Caclulate normals for mesh m using Newell's method."""
     fvs = m.vertices[m.faces]  # vertices of faces
-    normals = np.empty((m.faces.shape[0], 3))
+    normals = np.empty((m.faces.shape[0], 3), dtype=fvs.dtype)
     normals[:,0] =  (fvs[:,0,1] - fvs[:,1,1]) * (fvs[:,0,2] + fvs[:,1,2])
     normals[:,0] += (fvs[:,1,1] - fvs[:,2,1]) * (fvs[:,1,2] + fvs[:,2,2])
     normals[:,0] += (fvs[:,2,1] - fvs[:,0,1]) * (fvs[:,2,2] + fvs[:,0,2])
@@ -78,34 +78,25 @@ def vertex_normals(m, method="angle weighted", normalize=True):
     * 'angle weighted': as above but weighted by face angle adjacent to vertex
     """
     if method in ["average", "area weighted", "angle weighted"]:
-        v_normals = np.zeros_like(m.vertices)
+        # weights of face normals at each face corner
         if method == "average":
-            f_normals0 = f_normals1 = f_normals2 = m.normals
-            den0 = den1 = den2 = 1
+            f_normals = m.normals
+            w = np.ones(m.faces.shape, dtype=m.vertices.dtype)
         elif  method == "area weighted":
-            f_normals, areas = normals_cross(m)
-            den0 = den1 = den2 = areas
-            f_normals *= den0.reshape(-1,1)
-            f_normals0 = f_normals1 = f_normals2 = f_normals
+            f_normals = m.face_normals
+            w = np.repeat(m.face_areas.reshape(-1,1), 3, axis=1)
         else: # angle weighted
             f_normals = m.normals
-            angles = face_angles(m)
-            den0 = angles[:,0]
-            f_normals0 = f_normals * den0.reshape(-1,1)
-            den1 = angles[:,1]
-            f_normals1 = f_normals * den1.reshape(-1,1)
-            den2 = angles[:,2]
-            f_normals2 = f_normals * den2.reshape(-1,1)
-        np.add.at(v_normals, m.faces[:,0], f_normals0)
-        np.add.at(v_normals, m.faces[:,1], f_normals1)
-        np.add.at(v_normals, m.faces[:,2], f_normals2)
+            w = face_angles(m)
+        # accumulate corners with bincount, much faster than np.add.at
+        corners = m.faces.ravel()
+        n = m.vertices.shape[0]
+        v_normals = scatter_add(corners, (f_normals[:,np.newaxis,:] *
+                                          w[:,:,np.newaxis]).reshape(-1,3), n)
         if normalize:
             v_normals /= np.linalg.norm(v_normals, axis=1).reshape(-1,1)
         else:
-            denoms = np.zeros(m.vertices.shape[0])
-            np.add.at(denoms, m.faces[:,0], den0)
-            np.add.at(denoms, m.faces[:,1], den1)
-            np.add.at(denoms, m.faces[:,2], den2)
+            denoms = scatter_add(corners, w.ravel(), n)
             v_normals /= denoms.reshape(-1,1)
     else:
         raise NotImplemented("vertex normals method '" + method + "' not implemented")
@@ -114,7 +105,7 @@ def vertex_normals(m, method="angle weighted", normalize=True):
 def edge_lengths(m):
     """Return a list of unique edges and an array of their
     corresponding lengths."""
-    edges = sorted_edges(m, unique=True)
+    edges = m.edges
     evs = m.vertices[edges]
     d = np.linalg.norm(evs[:,1,:] - evs[:,0,:], axis=-1)
     return edges, d
@@ -124,21 +115,85 @@ def volume(m):
 
     For unbounded polytopes (with flipped normals) volume will be
     negative."""
-    n, a = normals_cross(m)
-    n *= a.reshape(-1,1)
+    n = m.face_normals * m.face_areas.reshape(-1,1)
     vs = m.vertices[m.faces[:,0]] # coords of first vertex of every face
     return np.vdot(vs, n) / 3
 def COG(m):
     """Center of gravity of mesh m.
 
     """
-    n, a = normals_cross(m)
-    n *= a.reshape(-1,1)
+    n = m.face_normals * m.face_areas.reshape(-1,1)
     vs = m.vertices[m.faces[:,0]] # coords of first vertex of every face
     V = np.vecdot(vs, n) / 3 # volumes of face tetrahedrons
     c = m.vertices[m.faces].sum(axis=1) / 4 # centers of tetrahedra based on faces
     return (V @ c) / V.sum() # devide by volume
 
+def _soup_cross(fvs):
+    """Cross products of edges of faces of a triangle soup.
+
+    Their lengths are twice face areas."""
+    fvs = np.asarray(fvs, dtype=float)
+    return np.cross(fvs[:,1,:] - fvs[:,0,:], fvs[:,2,:] - fvs[:,0,:])
+def stream_volume(chunks):
+    """Volume of a triangle soup given as an iterable of (normals,
+    triangle_vertices) batches, e.g. from py3do.io.iter_stl_chunks.
+
+    Only one batch is kept in memory at a time.  Result is the same as
+    of volume() on the welded mesh."""
+    v = 0.0
+    for _, fvs in chunks:
+        v += np.vdot(np.asarray(fvs[:,0,:], dtype=float), _soup_cross(fvs))
+    return v / 6
+def stream_COG(chunks):
+    """Center of gravity of a triangle soup given as an iterable of
+    (normals, triangle_vertices) batches.  See stream_volume."""
+    Vc = np.zeros(3)
+    V_sum = 0.0
+    for _, fvs in chunks:
+        fvs = np.asarray(fvs, dtype=float)
+        V = np.vecdot(fvs[:,0,:], _soup_cross(fvs)) / 6
+        Vc += V @ (fvs.sum(axis=1) / 4)
+        V_sum += V.sum()
+    return Vc / V_sum
+def stream_extents(chunks):
+    """Size of the bounding box of a triangle soup given as an
+    iterable of (normals, triangle_vertices) batches.  See
+    stream_volume."""
+    M = np.full(3, -np.inf)
+    m = np.full(3, np.inf)
+    for _, fvs in chunks:
+        if len(fvs) == 0:
+            continue
+        fvs = np.asarray(fvs).reshape(-1, 3)
+        np.maximum(M, fvs.max(axis=0), out=M)
+        np.minimum(m, fvs.min(axis=0), out=m)
+    return M - m
+def stream_surface_area(chunks):
+    """Surface area of a triangle soup given as an iterable of
+    (normals, triangle_vertices) batches.  See stream_volume."""
+    a = 0.0
+    for _, fvs in chunks:
+        a += np.linalg.norm(_soup_cross(fvs), axis=1).sum()
+    return a / 2
+
+def affine_parts(T):
+    """Split 3x4 or 4x4 affine matrices acting on column vectors (or
+    stacks of such matrices) into linear parts and translations."""
+    T = np.asarray(T, dtype=float)
+    if T.shape[-2:] not in [(3, 4), (4, 4)]:
+        raise RuntimeError("Affine transform must be a 3x4 or 4x4 matrix")
+    return T[...,:3,:3], T[...,:3,3]
+def transform_points(points, T):
+    """Apply affine transform T to an n x 3 array of points.
+
+    T is a 3x4 or 4x4 matrix acting on column vectors, or a stack of
+    N such matrices, in which case an N x n x 3 array is returned."""
+    A, t = affine_parts(T)
+    points = np.asarray(points)
+    A = A.astype(points.dtype, copy=False)
+    t = t.astype(points.dtype, copy=False)
+    return points @ np.swapaxes(A, -1, -2) + t[...,np.newaxis,:]
+
 def cart2sph(v):
     """Cartesian to spherical coordinates.
 
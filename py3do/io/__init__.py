@@ -1,7 +1,24 @@
 from .stl import read_ascii_stl
 from .stl import read_binary_stl
+from .stl import map_binary_stl
 from .stl import write_ascii_stl
 from .stl import write_binary_stl
 from .stl import read_stl
+from .stl import iter_stl_chunks
 from .obj import read_obj
+from .obj import write_obj
+from .ply import read_ply
+from .ply import write_ply
+from .threemf import read_3mf
+from .threemf import write_3mf
+from .native import read_native
+from .native import write_native
+from .cache import MeshCache
+from .aio import read_mesh_async
+from .aio import read_stl_async
+from .aio import write_binary_stl_async
+from .aio import write_ascii_stl_async
+from .aio import read_stl_stream
 from .utils import read_mesh
+from .utils import read_meshes
+from .utils import ReadResult
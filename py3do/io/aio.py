@@ -0,0 +1,137 @@
+"""Asynchronous mesh reading and writing for use with asyncio.
+
+File functions run their blocking counterparts in an executor thread.
+read_stl_stream parses STL data from an asynchronous byte stream, e.g.
+an HTTP request body, while it arrives.
+
+"""
+
+import asyncio
+import io
+from functools import partial
+from struct import unpack
+
+import numpy as np
+
+from .. import Mesh
+from ..utils import unique_points
+from .stl import read_stl, read_ascii_stl, write_ascii_stl, write_binary_stl
+from .stl import _facet_dtype
+from .utils import read_mesh
+
+async def _run_in_thread(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, partial(fn, *args, **kwargs))
+
+async def read_mesh_async(fname, **kwargs):
+    """Asynchronous version of read_mesh."""
+    return await _run_in_thread(read_mesh, fname, **kwargs)
+async def read_stl_async(fname, **kwargs):
+    """Asynchronous version of read_stl."""
+    return await _run_in_thread(read_stl, fname, **kwargs)
+async def write_binary_stl_async(m, fname, **kwargs):
+    """Asynchronous version of write_binary_stl."""
+    return await _run_in_thread(write_binary_stl, m, fname, **kwargs)
+async def write_ascii_stl_async(m, fname, **kwargs):
+    """Asynchronous version of write_ascii_stl."""
+    return await _run_in_thread(write_ascii_stl, m, fname, **kwargs)
+
+async def _iter_stream(stream, chunk_size):
+    """Iterate over chunks of an async byte stream.
+
+    stream either has a coroutine read(n) method (like
+    asyncio.StreamReader) or is an async iterable of bytes."""
+    if hasattr(stream, "read"):
+        while True:
+            chunk = await stream.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    else:
+        async for chunk in stream:
+            yield chunk
+
+def _weld_facets(data):
+    """Weld vertices of a batch of complete binary STL facets.
+
+    Returns unique points of the batch, faces indexing them, normals
+    and attributes."""
+    d = np.frombuffer(data, dtype=_facet_dtype)
+    vertices, idx = unique_points(d["v"].reshape(-1, 3))
+    return vertices, idx.reshape(-1, 3), d["normal"].copy(), d["attr"].copy()
+def _mesh_from_batches(batches, fix_nan_normals):
+    """Weld pre-welded facet batches into a mesh.
+
+    Only the unique points of each batch are welded again.  Batches
+    keep their points in order of first occurrence, so the result is
+    the same as welding all facets at once."""
+    if not batches:
+        batches = [_weld_facets(b"")]
+    vs, fs, normals, attrs = zip(*batches)
+    vertices, idx = unique_points(np.concatenate(vs))
+    offsets = np.cumsum([0] + [v.shape[0] for v in vs[:-1]])
+    faces = np.concatenate([idx[f + o] for f, o in zip(fs, offsets)])
+    attrs = np.concatenate(attrs)
+    # keep attributes only if they are actually used
+    face_attrs = attrs if attrs.any() else None
+    return Mesh(vertices, faces, np.concatenate(normals),
+                fix_nan_normals=fix_nan_normals, face_attrs=face_attrs)
+def _read_ascii_bytes(data, fix_nan_normals):
+    """Decode and parse ASCII STL data."""
+    return read_ascii_stl(io.StringIO(data.decode()),
+                          fix_nan_normals=fix_nan_normals)
+
+async def read_stl_stream(stream, *, fix_nan_normals=False,
+                          chunk_size=1 << 20):
+    """Read binary or ASCII STL from an asynchronous byte stream.
+
+    stream either has a coroutine read(n) method, like
+    asyncio.StreamReader or aiohttp's request.content, or is an async
+    iterable of bytes.  Memory use is bounded by the data actually
+    received, never by the face count in the header, and data beyond
+    the declared size is rejected immediately.
+
+    Binary facets are parsed while the upload continues: whenever at
+    least chunk_size bytes of complete facets have arrived, they are
+    welded in an executor thread, a partial facet is carried over to
+    the next batch.  After the upload ends only the unique points of
+    the batches are welded again.  ASCII data is collected, then
+    decoded and parsed in an executor thread.
+
+    """
+    loop = asyncio.get_running_loop()
+    head = bytearray()
+    pending = bytearray()  # facet data not yet sent to a batch
+    batches = []  # futures of welded batches
+    expected = None  # size of facet data declared in the header
+    received = 0
+    async for chunk in _iter_stream(stream, chunk_size):
+        if expected is None:
+            head += chunk
+            if len(head) < 84 or head[:6].lower() == b"solid ":
+                continue
+            n_faces = unpack("<L", head[80:84])[0]
+            expected = _facet_dtype.itemsize * n_faces
+            chunk = bytes(head[84:])
+        if received + len(chunk) > expected:
+            raise RuntimeError("Expected end of file")
+        pending += chunk
+        received += len(chunk)
+        if len(pending) >= chunk_size:
+            n = len(pending) // _facet_dtype.itemsize * _facet_dtype.itemsize
+            batches.append(loop.run_in_executor(None, _weld_facets,
+                                                bytes(pending[:n])))
+            del pending[:n]
+    if expected is None:
+        if head[:6].lower() == b"solid ":
+            return await _run_in_thread(_read_ascii_bytes, bytes(head),
+                                        fix_nan_normals)
+        raise RuntimeError("Unexpected end of file")
+    if received != expected:
+        raise RuntimeError("Unexpected end of file")
+    if pending:
+        batches.append(loop.run_in_executor(None, _weld_facets,
+                                            bytes(pending)))
+    batches = await asyncio.gather(*batches)
+    return await _run_in_thread(_mesh_from_batches, batches,
+                                fix_nan_normals)
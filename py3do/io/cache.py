@@ -0,0 +1,101 @@
+"""On-disk cache of parsed meshes."""
+
+import hashlib
+import os
+import tempfile
+
+from .native import read_native, write_native
+
+_SAMPLE_SIZE = 1 << 20  # bytes hashed at the beginning and end of file
+
+class MeshCache:
+    """Cache of parsed meshes stored in native py3do format.
+
+    Entries are keyed by file path, size, modification time and a hash
+    of the beginning and end of file content, so modified files are
+    parsed again.  Cached meshes are memory mapped when loaded.  If
+    max_bytes is given, least recently used entries are removed when
+    the cache grows larger.
+
+    Pass an instance as the cache argument of read_mesh.
+
+    """
+    def __init__(self, cache_dir, max_bytes=None):
+        self.cache_dir = os.fspath(cache_dir)
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    def key(self, fname, **params):
+        """Cache key of a file.
+
+        params are reading options which change the resulting mesh."""
+        fname = os.path.abspath(fname)
+        st = os.stat(fname)
+        h = hashlib.blake2b(digest_size=20)
+        h.update(repr((fname, st.st_size, st.st_mtime_ns,
+                       sorted(params.items()))).encode())
+        with open(fname, 'rb') as f:
+            h.update(f.read(_SAMPLE_SIZE))
+            if st.st_size > 2 * _SAMPLE_SIZE:
+                f.seek(-_SAMPLE_SIZE, os.SEEK_END)
+                h.update(f.read(_SAMPLE_SIZE))
+        return h.hexdigest()
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key + ".p3d")
+    def get(self, key):
+        """Return cached mesh or None."""
+        path = self._entry_path(key)
+        try:
+            m = read_native(path, trusted=True)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        os.utime(path)  # mark as recently used
+        self.hits += 1
+        return m
+    def put(self, key, m):
+        """Store mesh m under key."""
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write_native(m, f)
+            os.replace(tmp, self._entry_path(key))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        if self.max_bytes is not None:
+            self._evict(keep=key)
+    def _entries(self):
+        """List of (mtime, size, path) of cache entries."""
+        entries = []
+        for e in os.scandir(self.cache_dir):
+            if e.name.endswith(".p3d"):
+                st = e.stat()
+                entries.append((st.st_mtime_ns, st.st_size, e.path))
+        return entries
+    def _evict(self, keep=None):
+        """Remove least recently used entries above max_bytes."""
+        entries = sorted(self._entries())
+        total = sum(e[1] for e in entries)
+        keep = None if keep is None else self._entry_path(keep)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            os.unlink(path)
+            total -= size
+            self.evictions += 1
+    def clear(self):
+        """Remove all cache entries."""
+        for _, _, path in self._entries():
+            os.unlink(path)
+    def stats(self):
+        """Return a dict with numbers of hits, misses, evictions,
+        entries and total size of the cache in bytes."""
+        entries = self._entries()
+        return {"hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "entries": len(entries),
+                "bytes": sum(e[1] for e in entries)}
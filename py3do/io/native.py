@@ -0,0 +1,140 @@
+"""Native py3do mesh format.
+
+Files conventionally use the .p3d extension.  A file starts with a
+magic string and a JSON header describing the stored arrays, followed
+by the arrays themselves, each aligned to 64 bytes.  Uncompressed
+arrays are memory mapped on reading, so meshes load without parsing
+or copying.
+
+"""
+
+import json
+import zlib
+from contextlib import nullcontext
+from struct import pack, unpack
+
+import numpy as np
+
+from .. import Mesh
+from ..topo import EdgeToFaceMap
+
+_MAGIC = b"PY3DOMSH"
+_VERSION = 1
+_ALIGN = 64
+
+def _aligned(n):
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+def write_native(m, fname, *, topology=False, compress=False):
+    """Write mesh m in native py3do format.
+
+    Vertices, faces, normals and face attributes are stored as they
+    are.  If topology is True, sorted edge records of the
+    EdgeToFaceMap of m are stored as well, a map can be passed
+    instead of True to avoid recomputing it.  compress=True
+    compresses arrays with zlib, such files cannot be memory mapped.
+
+    """
+    arrays = {"vertices": m.vertices, "faces": m.faces,
+              "normals": m.normals}
+    if m.face_attrs is not None:
+        arrays["face_attrs"] = m.face_attrs
+    if topology is not False:
+        efm = m.edge_to_face_map if topology is True else topology
+        n = efm.edges_rec.shape[0]
+        arrays["edges_rec"] = efm.edges_rec.view(efm.view_dt["i"])\
+                                           .reshape(n, 3)
+        arrays["orientations"] = efm.orientations
+    header = {"version": _VERSION, "arrays": {}}
+    blobs = []
+    for name, a in arrays.items():
+        a = np.ascontiguousarray(a)
+        if compress:
+            b = zlib.compress(a)
+        else:
+            b = a
+        header["arrays"][name] = {"dtype": a.dtype.str,
+                                  "shape": list(a.shape),
+                                  "nbytes": len(b) if compress else a.nbytes,
+                                  "compression": "zlib" if compress else None}
+        blobs.append(b)
+    # offsets are relative to the start of data following the header
+    offset = 0
+    for name, b in zip(arrays, blobs):
+        header["arrays"][name]["offset"] = offset
+        offset = _aligned(offset + header["arrays"][name]["nbytes"])
+    header_b = json.dumps(header).encode("ascii")
+    data_start = _aligned(len(_MAGIC) + 4 + len(header_b))
+    if hasattr(fname, 'write'):
+        f_ctx = nullcontext(fname)
+    else:
+        f_ctx = open(fname, 'wb')
+    with f_ctx as f:
+        start = f.tell()
+        f.write(_MAGIC)
+        f.write(pack("<L", len(header_b)))
+        f.write(header_b)
+        for name, b in zip(arrays, blobs):
+            pos = data_start + header["arrays"][name]["offset"]
+            f.write(b"\0" * (start + pos - f.tell()))
+            f.write(b)
+
+def read_native(fname, *, mmap=True, trusted=False, return_topology=False):
+    """Read a mesh in native py3do format.
+
+    If mmap is True, uncompressed arrays are memory mapped
+    copy-on-write: the mesh can be modified without changing the
+    file.  mmap requires fname to be a file name or a file object of
+    a file on disk.  trusted=True skips mesh validation, use only for
+    files written by py3do.
+
+    If return_topology is True, a pair (mesh, efm) is returned where
+    efm is the EdgeToFaceMap stored in the file or None.  A stored map
+    is also used as the mesh's cached edge_to_face_map.
+
+    """
+    if hasattr(fname, 'read'):
+        f_ctx = nullcontext(fname)
+    else:
+        f_ctx = open(fname, 'rb')
+    arrays = {}
+    with f_ctx as f:
+        start = f.tell()
+        if f.read(len(_MAGIC)) != _MAGIC:
+            raise RuntimeError("Not a py3do mesh file")
+        header_len = unpack("<L", f.read(4))[0]
+        header = json.loads(f.read(header_len).decode("ascii"))
+        if header["version"] > _VERSION:
+            raise RuntimeError("Unsupported py3do mesh file version")
+        data_start = start + _aligned(len(_MAGIC) + 4 + header_len)
+        for name, info in header["arrays"].items():
+            dt = np.dtype(info["dtype"])
+            shape = tuple(info["shape"])
+            pos = data_start + info["offset"]
+            if info["compression"] is None and mmap and info["nbytes"] > 0:
+                a = np.memmap(f, dtype=dt, mode="c", offset=pos, shape=shape)
+            else:
+                f.seek(pos)
+                b = bytearray(f.read(info["nbytes"]))
+                if len(b) != info["nbytes"]:
+                    raise RuntimeError("Unexpected end of file")
+                if info["compression"] == "zlib":
+                    b = bytearray(zlib.decompress(b))
+                elif info["compression"] is not None:
+                    raise RuntimeError("Unknown compression: "
+                                       + str(info["compression"]))
+                a = np.frombuffer(b, dtype=dt).reshape(shape)
+            arrays[name] = a
+    m = Mesh(arrays["vertices"], arrays["faces"], arrays["normals"],
+             face_attrs=arrays.get("face_attrs"), validate=not trusted,
+             dtype=arrays["vertices"].dtype)
+    efm = None
+    if "edges_rec" in arrays:
+        efm = EdgeToFaceMap.from_sorted_records(arrays["edges_rec"],
+                                                arrays["orientations"])
+        # stored map is used by m.edge_to_face_map instead of
+        # rebuilding it
+        m._cache["edge_to_face_map"] = efm
+    if return_topology:
+        return m, efm
+    return m
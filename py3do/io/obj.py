@@ -1,56 +1,132 @@
-"""OBJ file reader."""
+"""OBJ file reader and writer."""
 
+import re
 from contextlib import nullcontext
 
 import numpy as np
 
 from .. import Mesh
 
+_v_re = re.compile(r"^[ \t]*v[ \t]+(\S+[ \t]+\S+[ \t]+\S+)", re.M)
+_f_re = re.compile(r"^[ \t]*f[ \t]+([^\n#]*)", re.M)
+
+def _face_vertex_indices(ftext, n_lines):
+    """Parse vertex indices of faces given one per line in ftext.
+
+    Face corners may have the form v, v/vt, v//vn or v/vt/vn.  Returns
+    a flat array of vertex indices (as in the file) and the number of
+    corners of each face.
+
+    """
+    b = np.frombuffer(ftext.encode(), dtype=np.uint8)
+    is_nl = (b == ord("\n"))
+    is_sep = is_nl | (b == ord(" ")) | (b == ord("\t")) | (b == ord("\r"))
+    starts = ~is_sep
+    starts[1:] &= is_sep[:-1]
+    # work on positions to keep memory proportional to number of corners
+    starts = np.flatnonzero(starts)
+    counts = np.bincount(np.searchsorted(np.flatnonzero(is_nl), starts),
+                         minlength=n_lines)
+    # number of integers in each corner is the number of slashes + 1
+    slash_corner = np.searchsorted(starts, np.flatnonzero(b == ord("/")),
+                                   side="right") - 1
+    n_ints = np.bincount(slash_corner, minlength=starts.shape[0]) + 1
+    ints = np.fromstring(ftext.replace("//", "/0/").replace("/", " "),
+                         dtype=np.int64, sep=" ")
+    if ints.shape[0] != n_ints.sum():
+        raise RuntimeError("Wrong vertex index in OBJ face")
+    return ints[np.cumsum(n_ints) - n_ints], counts
+
+def _fan_triangulate(idx, counts):
+    """Fan triangulate polygons given as a flat index array and the
+    number of vertices of each polygon."""
+    n_tri = np.maximum(counts - 2, 0)
+    offsets = np.cumsum(counts) - counts
+    tri_poly = np.repeat(np.arange(len(counts)), n_tri)
+    j = np.arange(n_tri.sum()) - np.repeat(np.cumsum(n_tri) - n_tri, n_tri)
+    first = offsets[tri_poly]
+    return np.column_stack([idx[first], idx[first+j+1], idx[first+j+2]])
+
 def read_obj(fname, *, fix_nan_normals=False):
-    """Read a simple OBJ file with vertices and triangular faces.
-    
-    This function only reads vertex coordinates and assumes all faces
-    are triangular. It does not read normals, texture coordinates,
-    or other OBJ features.
-    
+    """Read an OBJ file with vertices and polygonal faces.
+
+    Vertex coordinates and faces are read, polygons with more than
+    three vertices are fan triangulated.  Face vertices may be given
+    as v, v/vt, v//vn or v/vt/vn, negative indices are relative to the
+    last vertex read.  Texture coordinates and vertex normals are not
+    stored in the mesh.  Faces with fewer than three vertices are
+    skipped.
+
+    The file is parsed in bulk: vertex and face lines are extracted
+    with regular expressions, coordinates of all vertices and indices
+    of all faces are each converted to an array at once.
+
     Args:
         fname: File path or file-like object
-    
+
         fix_nan_normals: if True allow incorrect normals an fix them.
             Useful for models with degenerate faces.
-        
+
     Returns:
         Mesh object with vertices and faces
 
     """
-    vertices = []
-    faces = []
-    
     # Handle both file paths and file-like objects
     if hasattr(fname, 'read'):
         f_ctx = nullcontext(fname)
     else:
         f_ctx = open(fname, 'r')
     with f_ctx as fl:
-        for line in fl:
-            line = line.strip()
-            if not line or line.startswith('#'):
-                continue
-                
-            parts = line.split()
-            if not parts:
-                continue
-                
-            if parts[0] == 'v':
-                # Vertex line: v x y z
-                if len(parts) >= 4:
-                    vertex = tuple(float(parts[i]) for i in range(1, 4))
-                    vertices.append(vertex)
-            elif parts[0] == 'f':
-                # Face line: f v1 v2 v3 (assuming triangular)
-                if len(parts) >= 4:
-                    # OBJ indices are 1-based, convert to 0-based
-                    face = tuple(int(parts[i].split('/')[0]) - 1 for i in range(1, 4))
-                    faces.append(face)
+        text = fl.read()
+    # coordinates of all vertex lines are converted in one pass
+    v_strs = _v_re.findall(text)
+    try:
+        vertices = np.fromstring("\n".join(v_strs), dtype=float, sep=" ")
+    except ValueError:
+        vertices = None
+    if vertices is None or vertices.shape[0] != 3 * len(v_strs):
+        raise RuntimeError("Wrong vertex coordinate in OBJ file")
+    vertices = vertices.reshape(-1, 3)
+    f_strs = _f_re.findall(text)
+    idx, counts = _face_vertex_indices("\n".join(f_strs), len(f_strs))
+    if (idx == 0).any():
+        raise RuntimeError("OBJ vertex indices cannot be 0")
+    # OBJ indices are 1-based, convert to 0-based
+    neg = (idx < 0)
+    idx -= 1
+    if neg.any():
+        # relative indices: count vertices preceding each face line
+        v_pos = [m.start() for m in _v_re.finditer(text)]
+        f_pos = [m.start() for m in _f_re.finditer(text)]
+        n_before = np.searchsorted(v_pos, f_pos)
+        idx_face = np.repeat(np.arange(len(f_strs)), counts)
+        idx[neg] = n_before[idx_face[neg]] + idx[neg] + 1
+    faces = _fan_triangulate(idx, counts)
     m = Mesh(vertices, faces, fix_nan_normals=fix_nan_normals)
     return m
+
+def write_obj(m, fname, *, float_fmt="%r", chunk_size=100_000):
+    """Write vertices and faces of mesh m to an OBJ file.
+
+    float_fmt is a %-style format used for vertex coordinates, the
+    default "%r" writes the shortest representation which reads back
+    exactly.  Vertices and faces are formatted in bulk in chunks of
+    chunk_size lines.
+
+    """
+    if hasattr(fname, 'write'):
+        f_ctx = nullcontext(fname)
+    else:
+        f_ctx = open(fname, 'w')
+    v_template = "v " + " ".join([float_fmt] * 3) + "\n"
+    f_template = "f %d %d %d\n"
+    with f_ctx as f:
+        f.write("# exported from py3do\n")
+        for template, data, shift in [(v_template, m.vertices, 0),
+                                      (f_template, m.faces, 1)]:
+            n = data.shape[0]
+            for i in range(0, n, chunk_size):
+                j = min(i + chunk_size, n)
+                # OBJ indices are 1-based
+                values = (data[i:j] + shift).ravel().tolist()
+                f.write((template * (j - i)) % tuple(values))
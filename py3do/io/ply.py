@@ -0,0 +1,268 @@
+"""PLY file reader and writer."""
+
+from contextlib import nullcontext
+
+import numpy as np
+
+from .. import Mesh
+from .obj import _fan_triangulate
+
+_ply_types = {"char": "i1", "int8": "i1",
+              "uchar": "u1", "uint8": "u1",
+              "short": "i2", "int16": "i2",
+              "ushort": "u2", "uint16": "u2",
+              "int": "i4", "int32": "i4",
+              "uint": "u4", "uint32": "u4",
+              "float": "f4", "float32": "f4",
+              "double": "f8", "float64": "f8",
+              }
+_ply_formats = {"ascii": None,
+                "binary_little_endian": "<",
+                "binary_big_endian": ">",
+                }
+
+def _read_ply_header(f):
+    """Parse PLY header.
+
+    Returns format name and a list of elements.  Each element is a
+    tuple (name, count, properties), each property a tuple (name,
+    type, list count type) with the last entry None for scalar
+    properties."""
+    if f.readline().strip() != b"ply":
+        raise RuntimeError("Wrong PLY header")
+    fmt = None
+    elements = []
+    while True:
+        l = f.readline()
+        if l == b"":
+            raise RuntimeError("Unexpected end of PLY header")
+        toks = l.decode("ascii").split()
+        if len(toks) == 0 or toks[0] in ("comment", "obj_info"):
+            continue
+        if toks[0] == "end_header":
+            break
+        if toks[0] == "format":
+            if len(toks) != 3 or toks[1] not in _ply_formats:
+                raise RuntimeError("Unsupported PLY format: " + l.decode().strip())
+            fmt = toks[1]
+        elif toks[0] == "element":
+            elements.append((toks[1], int(toks[2]), []))
+        elif toks[0] == "property":
+            if len(elements) == 0:
+                raise RuntimeError("PLY property outside of element")
+            try:
+                if toks[1] == "list":
+                    prop = (toks[4], _ply_types[toks[3]], _ply_types[toks[2]])
+                else:
+                    prop = (toks[2], _ply_types[toks[1]], None)
+            except (IndexError, KeyError):
+                raise RuntimeError("Wrong PLY property: " + l.decode().strip())
+            elements[-1][2].append(prop)
+        else:
+            raise RuntimeError("Unknown PLY header line: " + l.decode().strip())
+    if fmt is None:
+        raise RuntimeError("Missing PLY format")
+    return fmt, elements
+
+def _element_dtype(props, bo, list_len=None):
+    """Structured dtype of an element record.
+
+    list_len is the assumed length of list properties."""
+    fields = []
+    for name, t, count_t in props:
+        if count_t is None:
+            fields.append((name, bo + t))
+        else:
+            fields.append((name + "_count", bo + count_t))
+            fields.append((name, bo + t, (list_len,)))
+    return np.dtype(fields)
+
+def _read_binary_element(buf, pos, n, props, bo):
+    """Read n records of a binary element starting at buf[pos].
+
+    Returns a dict of property arrays (list properties as a flat array
+    and an array of counts) and the position after the element."""
+    list_props = [p for p in props if p[2] is not None]
+    if len(list_props) <= 1:
+        # assume all lists have the same length as the first one
+        list_len = 0
+        if len(list_props) > 0 and n > 0:
+            first_dt = _element_dtype(props, bo, 0)
+            count_off = first_dt.fields[list_props[0][0] + "_count"][1]
+            count_dt = np.dtype(bo + list_props[0][2])
+            list_len = int(np.frombuffer(buf, dtype=count_dt, count=1,
+                                         offset=pos + count_off)[0])
+        dt = _element_dtype(props, bo, list_len)
+        if pos + n * dt.itemsize <= len(buf):
+            d = np.frombuffer(buf, dtype=dt, count=n, offset=pos)
+            if all((d[p[0] + "_count"] == list_len).all() for p in list_props):
+                ret = {p[0]: d[p[0]] for p in props}
+                for p in list_props:
+                    ret[p[0]] = ret[p[0]].ravel()
+                    ret[p[0] + "_count"] = np.full(n, list_len)
+                return ret, pos + n * dt.itemsize
+    # lists of varying length: read record by record
+    values = {p[0]: [] for p in props}
+    counts = {p[0]: [] for p in list_props}
+    for i in range(n):
+        for name, t, count_t in props:
+            if count_t is None:
+                dt = np.dtype(bo + t)
+                values[name].append(np.frombuffer(buf, dtype=dt, count=1,
+                                                  offset=pos))
+                pos += dt.itemsize
+            else:
+                count_dt = np.dtype(bo + count_t)
+                k = int(np.frombuffer(buf, dtype=count_dt, count=1,
+                                      offset=pos)[0])
+                pos += count_dt.itemsize
+                dt = np.dtype(bo + t)
+                values[name].append(np.frombuffer(buf, dtype=dt, count=k,
+                                                  offset=pos))
+                counts[name].append(k)
+                pos += k * dt.itemsize
+    ret = {}
+    for name, t, count_t in props:
+        ret[name] = np.concatenate(values[name] or [np.empty(0, dtype=t)])
+        if count_t is not None:
+            ret[name + "_count"] = np.array(counts[name], dtype=int)
+    return ret, pos
+
+def _read_ascii_element(toks, pos, n, props):
+    """Read n records of an ASCII element from a list of tokens.
+
+    Returns a dict of property arrays and the position after the
+    element, as in _read_binary_element."""
+    list_props = [p for p in props if p[2] is not None]
+    n_scalar = len(props) - len(list_props)
+    if len(list_props) <= 1:
+        # assume all lists have the same length as the first one
+        list_len = 0
+        if len(list_props) > 0 and n > 0:
+            list_pos = props.index(list_props[0])  # preceded by scalars
+            list_len = int(toks[pos + list_pos])
+        rec_len = n_scalar + len(list_props) * (list_len + 1)
+        if pos + n * rec_len <= len(toks):
+            d = np.array(toks[pos:pos + n * rec_len],
+                         dtype=float).reshape(n, rec_len)
+            ret = {}
+            k = 0
+            for name, t, count_t in props:
+                if count_t is None:
+                    ret[name] = d[:,k].astype(t)
+                    k += 1
+                else:
+                    ret[name + "_count"] = d[:,k].astype(int)
+                    ret[name] = d[:,k+1:k+1+list_len].astype(t).ravel()
+                    k += list_len + 1
+            if all((ret[p[0] + "_count"] == list_len).all()
+                   for p in list_props):
+                return ret, pos + n * rec_len
+    # lists of varying length: read record by record
+    values = {p[0]: [] for p in props}
+    counts = {p[0]: [] for p in list_props}
+    for i in range(n):
+        for name, t, count_t in props:
+            if count_t is None:
+                values[name].append(toks[pos])
+                pos += 1
+            else:
+                k = int(toks[pos])
+                values[name].extend(toks[pos+1:pos+1+k])
+                counts[name].append(k)
+                pos += k + 1
+    ret = {}
+    for name, t, count_t in props:
+        ret[name] = np.array(values[name], dtype=float).astype(t)
+        if count_t is not None:
+            ret[name + "_count"] = np.array(counts[name], dtype=int)
+    return ret, pos
+
+def read_ply(fname, *, fix_nan_normals=False):
+    """Read an ASCII or binary PLY file.
+
+    Vertex coordinates are taken from the x, y, z properties of the
+    'vertex' element, faces from the 'vertex_indices' (or
+    'vertex_index') list property of the 'face' element.  Polygons are
+    fan triangulated, other elements and properties are ignored.
+
+    When all faces have the same number of vertices, binary elements
+    are read directly from the file buffer with a structured dtype.
+
+    """
+    if hasattr(fname, 'read'):
+        f_ctx = nullcontext(fname)
+    else:
+        f_ctx = open(fname, 'rb')
+    with f_ctx as f:
+        fmt, elements = _read_ply_header(f)
+        data = f.read()
+    bo = _ply_formats[fmt]
+    if bo is None:
+        toks = data.split()
+    pos = 0
+    parsed = {}
+    for name, n, props in elements:
+        if bo is None:
+            el, pos = _read_ascii_element(toks, pos, n, props)
+        else:
+            el, pos = _read_binary_element(data, pos, n, props, bo)
+        parsed[name] = el
+    if "vertex" not in parsed:
+        raise RuntimeError("PLY file has no vertex element")
+    v = parsed["vertex"]
+    vertices = np.column_stack([v["x"], v["y"], v["z"]])
+    faces = np.empty((0, 3), dtype=int)
+    if "face" in parsed:
+        fc = parsed["face"]
+        key = "vertex_indices" if "vertex_indices" in fc else "vertex_index"
+        if key not in fc:
+            raise RuntimeError("PLY face element has no vertex_indices")
+        faces = _fan_triangulate(fc[key].astype(np.intp),
+                                 fc[key + "_count"])
+    m = Mesh(vertices, faces, fix_nan_normals=fix_nan_normals)
+    return m
+
+def write_ply(m, fname, *, binary=True, float_fmt="%r"):
+    """Write vertices and faces of mesh m to a PLY file.
+
+    By default binary little endian format is used with double
+    precision vertex coordinates and 32 bit face indices: vertices are
+    written directly from m.vertices, faces with a single write of a
+    structured array.  binary=False writes an ASCII file with
+    coordinates formatted using float_fmt.
+
+    """
+    if hasattr(fname, 'write'):
+        f_ctx = nullcontext(fname)
+    else:
+        f_ctx = open(fname, 'wb')
+    n_v = m.vertices.shape[0]
+    n_f = m.faces.shape[0]
+    fmt = "binary_little_endian" if binary else "ascii"
+    header = ("ply\n"
+              "format " + fmt + " 1.0\n"
+              "comment exported from py3do\n"
+              "element vertex " + str(n_v) + "\n"
+              "property double x\n"
+              "property double y\n"
+              "property double z\n"
+              "element face " + str(n_f) + "\n"
+              "property list uchar int vertex_indices\n"
+              "end_header\n")
+    with f_ctx as f:
+        f.write(header.encode("ascii"))
+        if binary:
+            v = np.ascontiguousarray(m.vertices, dtype="<f8")
+            f.write(v)
+            d = np.empty(n_f, dtype=_element_dtype(
+                [("vertex_indices", "i4", "u1")], "<", 3))
+            d["vertex_indices_count"] = 3
+            d["vertex_indices"] = m.faces
+            f.write(d)
+        else:
+            v_template = " ".join([float_fmt] * 3) + "\n"
+            f.write((v_template * n_v %
+                     tuple(m.vertices.ravel().tolist())).encode("ascii"))
+            f.write(("3 %d %d %d\n" * n_f %
+                     tuple(m.faces.ravel().tolist())).encode("ascii"))
@@ -2,11 +2,12 @@ import io
 from contextlib import nullcontext
 from itertools import count
 from collections import defaultdict
-from struct import unpack, pack, Struct
+from struct import unpack, pack
 
 import numpy as np
 
 from .. import Mesh
+from ..utils import unique_points
 
 def _numbered_line_reader(f):
     for li, l in enumerate(f):
@@ -49,154 +50,261 @@ def _vertex_list_from_map(vertex_map):
     vertices = list(vertex_map.keys())
     return vertices
 
-def read_ascii_stl(fname, *, fix_nan_normals=False):
+def _ascii_stl_facets(fl):
+    """Generate (normal, v1, v2, v3) tuples for facets of an open
+    ASCII STL file."""
+    f = _numbered_line_reader(fl)
+    li, header = next(f)
+    if header[0:6].lower() != "solid ":
+        raise RuntimeError("Wrong ASCII STL header")
+    name = header[6:].strip()
+    while True:
+        normal, li, l = _parse_vector(f, "facet normal",
+                                      raise_on_nonmatch=False)
+        if normal is None:
+            if li is None:  # end of file
+                raise RuntimeError("Missing 'endsolid'")
+            if l.startswith("endsolid"):
+                if name != l[9:]:
+                    print("Warning: different names in 'solid'"
+                              " and 'endsolid'")
+                break
+            raise RuntimeError("Expected 'facet'")
+        _match_line(f, "outer loop")
+        v1, li, l = _parse_vector(f, "vertex")
+        v2, li, l = _parse_vector(f, "vertex")
+        v3, li, l = _parse_vector(f, "vertex")
+        _match_line(f, "endloop")
+        _match_line(f, "endfacet")
+        yield normal, v1, v2, v3
+    for li, l in f:
+        if l != "":
+            raise RuntimeError("Content after 'endsolid'")
+
+_ascii_facet_len = 21  # tokens per facet
+_ascii_facet_keywords = [(0, "facet"), (1, "normal"),
+                         (5, "outer"), (6, "loop"),
+                         (7, "vertex"), (11, "vertex"), (15, "vertex"),
+                         (19, "endloop"), (20, "endfacet")]
+_ascii_facet_numbers = [2, 3, 4, 8, 9, 10, 12, 13, 14, 16, 17, 18]
+def _parse_ascii_stl_fast(text):
+    """Parse the whole text of an ASCII STL file in bulk.
+
+    The text is split into whitespace separated tokens, keywords are
+    checked for all facets at once and all coordinates are converted
+    in a single call.  Returns normals and face vertex coordinates, or
+    None if the text does not have the expected structure, in which
+    case the strict line based parser should be used to report the
+    error.
+
+    """
+    header, _, body = text.partition("\n")
+    header = header.strip()
+    if header[0:6].lower() != "solid ":
+        return None
+    name = header[6:].strip()
+    body, endsolid, tail = body.rpartition("endsolid")
+    if endsolid == "":
+        return None
+    end_line, _, rest = tail.partition("\n")
+    if rest.strip() != "":
+        return None
+    toks = body.split()
+    if len(toks) % _ascii_facet_len != 0:
+        return None
+    if len(toks) > 0:
+        for k, kw in _ascii_facet_keywords:
+            if set(toks[k::_ascii_facet_len]) != {kw}:
+                return None
+    try:
+        nums = np.array([toks[k::_ascii_facet_len]
+                         for k in _ascii_facet_numbers], dtype=float)
+    except ValueError:
+        return None
+    if name != (endsolid + end_line).strip()[9:]:
+        print("Warning: different names in 'solid' and 'endsolid'")
+    nums = nums.T
+    return nums[:,:3], nums[:,3:].reshape(-1, 3, 3)
+def _read_ascii_stl_strict(fl):
     vertex_map = defaultdict(count().__next__)
     faces = []
     normals = []
+    for normal, v1, v2, v3 in _ascii_stl_facets(fl):
+        i1 = vertex_map[v1]
+        i2 = vertex_map[v2]
+        i3 = vertex_map[v3]
+        faces.append((i1, i2, i3))
+        normals.append(normal)
+    vertices = _vertex_list_from_map(vertex_map)
+    return vertices, faces, normals
+def read_ascii_stl(fname, *, fix_nan_normals=False, dtype=np.float64):
+    """Read ASCII STL.
+
+    The file is parsed in bulk.  If it is malformed, it is parsed
+    again line by line to give a precise error message.  dtype is the
+    floating point type of mesh vertices and normals.
+
+    """
     if hasattr(fname, 'read'):
         f_ctx = nullcontext(fname)
     else:
         f_ctx = open(fname, 'r')
     with f_ctx as fl:
-        f = _numbered_line_reader(fl)
-        li, header = next(f)
-        if header[0:6].lower() != "solid ":
-            raise RuntimeError("Wrong ASCII STL header")
-        name = header[6:].strip()
-        while True:
-            normal, li, l = _parse_vector(f, "facet normal",
-                                          raise_on_nonmatch=False)
-            if normal is None:
-                if li is None:  # end of file
-                    raise RuntimeError("Missing 'endsolid'")
-                if l.startswith("endsolid"):
-                    if name != l[9:]:
-                        print("Warning: different names in 'solid'"
-                                  " and 'endsolid'")
-                    break
-                raise RuntimeError("Expected 'facet'")
-            _match_line(f, "outer loop")
-            v1, li, l = _parse_vector(f, "vertex")
-            v2, li, l = _parse_vector(f, "vertex")
-            v3, li, l = _parse_vector(f, "vertex")
-            _match_line(f, "endloop")
-            _match_line(f, "endfacet")
-            i1 = vertex_map[v1]
-            i2 = vertex_map[v2]
-            i3 = vertex_map[v3]
-            faces.append((i1, i2, i3))
-            normals.append(normal)
-        else:
-            raise RuntimeError("Missing 'endsolid'")
-        for li, l in f:
-            if l != "":
-                raise RuntimeError("Content after 'endsolid'")
-    vertices = _vertex_list_from_map(vertex_map)
-    m = Mesh(vertices, faces, normals, fix_nan_normals=fix_nan_normals)
+        text = fl.read()
+    parsed = _parse_ascii_stl_fast(text)
+    if parsed is not None:
+        normals, fvs = parsed
+        vertices, faces = _weld_vertices(fvs)
+    else:
+        vertices, faces, normals = _read_ascii_stl_strict(io.StringIO(text))
+    m = Mesh(vertices, faces, normals, fix_nan_normals=fix_nan_normals,
+             dtype=dtype)
     return m
 
-def _vector_to_str(v):
-    return " ".join(str(x) for x in v)
-def write_ascii_stl(m, fname, model_name="exported from py3do", indent=2):
+def write_ascii_stl(m, fname, model_name="exported from py3do", indent=2, *,
+                    float_fmt="%r", chunk_faces=100_000):
+    """Write ASCII STL.
+
+    float_fmt is a %-style format used for all coordinates.  The
+    default "%r" writes the shortest representation which reads back
+    exactly, formats such as "%.6g" give smaller files.
+
+    Facets are formatted in bulk by applying a template to chunks of
+    chunk_faces facets, each chunk is written with a single call.
+
+    """
     if m.normals is None:
         raise RuntimeError("Face normal not available in model")
     if hasattr(fname, 'write'):
         f_ctx = nullcontext(fname)
     else:
         f_ctx = open(fname, 'w')
-    fvs = m.vertices[m.faces]  # vertices of faces
-    ol_str = "\nouter loop\n" + " "*indent + "vertex "
-    v_str = "\n" + " "*indent + "vertex "
+    v_fmt = " ".join([float_fmt] * 3)
+    v_str = " "*indent + "vertex " + v_fmt + "\n"
+    facet_template = "facet normal " + v_fmt + "\nouter loop\n" +\
+                     v_str * 3 + "endloop\nendfacet\n"
+    n_faces = m.faces.shape[0]
     with f_ctx as f:
         f.write("solid ")
-        f.write("model_name\n")
-        for i, fv in enumerate(fvs.tolist()):
-            f.write("facet normal ")
-            f.write(_vector_to_str(m.normals[i]))
-            f.write(ol_str)
-            f.write(_vector_to_str(fv[0]))
-            f.write(v_str)
-            f.write(_vector_to_str(fv[1]))
-            f.write(v_str)
-            f.write(_vector_to_str(fv[2]))
-            f.write("\nendloop\n")
-            f.write("endfacet\n")
+        f.write(model_name + "\n")
+        for i in range(0, n_faces, chunk_faces):
+            j = min(i + chunk_faces, n_faces)
+            fvs = m.vertices[m.faces[i:j]]  # vertices of faces
+            data = np.column_stack([m.normals[i:j], fvs.reshape(-1, 9)])
+            f.write((facet_template * (j - i)) % tuple(data.ravel().tolist()))
         f.write("endsolid ")
-        f.write("model_name")
+        f.write(model_name)
 
 def _read_n_bytes(f, n):
     b = f.read(n)
     if len(b) != n:
         raise RuntimeError("Unexpected end of file")
     return b
-def read_binary_stl_numpy(fname, *, fix_nan_normals=False):
-    """Use numpy operations to read stl.  Unfortunately np.unique is
-    slower that python dicts."""
-    facet_dtype = [("normal", "<f4", (3,)),
-                   ("v", "<f4", (3,3)),
-                   ("attr", np.uint16)
-                   ]
-    if hasattr(fname, 'read'):
-        f_ctx = nullcontext(fname)
-    else:
-        f_ctx = open(fname, 'rb')
-    with f_ctx as f:
-        header = _read_n_bytes(f, 80)
-        n_faces_b = _read_n_bytes(f, 4)
-        n_faces = unpack("<L", n_faces_b)[0]
-        try:
-            d = np.fromfile(f, dtype=facet_dtype, count=n_faces)
-        except io.UnsupportedOperation: # probably StringIO
-            d = np.frombuffer(f.read(), dtype=facet_dtype, count=n_faces)            
-        if len(f.read(1)) != 0:
-            raise RuntimeError("Expected end of file")
-    vertices, faces = np.unique(d["v"].reshape(-1,3), axis=0, return_inverse=True)
-    faces = faces.reshape(-1,3)
-    normals = d["normal"]
-    m = Mesh(vertices, faces, normals, fix_nan_normals=fix_nan_normals)
+_facet_dtype = np.dtype([("normal", "<f4", (3,)),
+                         ("v", "<f4", (3,3)),
+                         ("attr", "<u2"),
+                         ])
+
+def _weld_vertices(vs):
+    """Merge identical vertices of a triangle soup.
+
+    vs is an n x 3 x 3 float array of face vertex coordinates.
+    Returns unique vertices in order of first occurrence and faces
+    indexing them, the same as obtained by welding with a dict.
+
+    """
+    vertices, idx = unique_points(vs.reshape(-1, 3))
+    return vertices, idx.reshape(-1, 3)
+
+def _mesh_from_facets(d, *, fix_nan_normals=False, dtype=np.float64):
+    """Create a mesh from an array of binary STL facets."""
+    vertices, faces = _weld_vertices(d["v"])
+    # keep attributes only if they are actually used
+    face_attrs = d["attr"].copy() if d["attr"].any() else None
+    m = Mesh(vertices, faces, d["normal"], fix_nan_normals=fix_nan_normals,
+             face_attrs=face_attrs, dtype=dtype)
     return m
-def read_binary_stl(fname, *, fix_nan_normals=False):
-    vertex_map = defaultdict(count().__next__)
-    faces = []
-    normals = []
-    facet_str = Struct("<" + "f" * 12 + "H")
+def map_binary_stl(fname):
+    """Memory map facets of a binary STL file.
+
+    Returns a read-only structured array with fields 'normal', 'v'
+    (3 x 3 vertex coordinates) and 'attr' backed directly by the file,
+    so the triangle soup can be processed without loading it into
+    memory.  fname must be a file name or a file object of a file on
+    disk.
+
+    """
     if hasattr(fname, 'read'):
         f_ctx = nullcontext(fname)
     else:
         f_ctx = open(fname, 'rb')
     with f_ctx as f:
+        start = f.tell()
         header = _read_n_bytes(f, 80)
         n_faces_b = _read_n_bytes(f, 4)
         n_faces = unpack("<L", n_faces_b)[0]
-        buf = f.read(facet_str.size * n_faces)
-        if len(f.read(1)) != 0:
+        f.seek(0, io.SEEK_END)
+        size = f.tell() - start - 84
+        if size < _facet_dtype.itemsize * n_faces:
+            raise RuntimeError("Unexpected end of file")
+        if size > _facet_dtype.itemsize * n_faces:
             raise RuntimeError("Expected end of file")
-    for normal_x, normal_y, normal_z, \
-        v1x, v1y, v1z, \
-        v2x, v2y, v2z, \
-        v3x, v3y, v3z, \
-        attr in facet_str.iter_unpack(buf):
-        normal = (normal_x, normal_y, normal_z)
-        v1 = (v1x, v1y, v1z)
-        v2 = (v2x, v2y, v2z)
-        v3 = (v3x, v3y, v3z)
-        i1 = vertex_map[v1]
-        i2 = vertex_map[v2]
-        i3 = vertex_map[v3]
-        faces.append((i1, i2, i3))
-        normals.append(normal)
-    vertices = _vertex_list_from_map(vertex_map)
-    m = Mesh(vertices, faces, normals, fix_nan_normals=fix_nan_normals)
-    return m
+        if n_faces == 0:
+            return np.empty(0, dtype=_facet_dtype)
+        d = np.memmap(f, dtype=_facet_dtype, mode="r",
+                      offset=start + 84, shape=(n_faces,))
+    return d
+def read_binary_stl(fname, *, fix_nan_normals=False, mmap=False,
+                    dtype=np.float64):
+    """Read binary STL.
+
+    Facet attributes are stored in face_attrs of the returned mesh if
+    any of them is nonzero.  If mmap is True, the file is memory
+    mapped (see map_binary_stl) instead of read into a buffer, so
+    facets are a zero-copy view of the file and no up-front read
+    buffer is allocated.  Vertex welding still processes all corner
+    points at once, peak memory is several times the file size either
+    way.  For files larger than available RAM use map_binary_stl or
+    iter_stl_chunks with streaming reductions instead.
 
-def write_binary_stl(m, fname, header=b"exported from py3do"):
+    dtype is the floating point type of mesh vertices and normals,
+    np.float32 keeps the precision stored in the file at half the
+    memory.
+
+    """
+    if mmap:
+        d = map_binary_stl(fname)
+    else:
+        if hasattr(fname, 'read'):
+            f_ctx = nullcontext(fname)
+        else:
+            f_ctx = open(fname, 'rb')
+        with f_ctx as f:
+            header = _read_n_bytes(f, 80)
+            n_faces_b = _read_n_bytes(f, 4)
+            n_faces = unpack("<L", n_faces_b)[0]
+            buf = _read_n_bytes(f, _facet_dtype.itemsize * n_faces)
+            if len(f.read(1)) != 0:
+                raise RuntimeError("Expected end of file")
+        d = np.frombuffer(buf, dtype=_facet_dtype, count=n_faces)
+    return _mesh_from_facets(d, fix_nan_normals=fix_nan_normals, dtype=dtype)
+
+def write_binary_stl(m, fname, header=b"exported from py3do", *,
+                     chunk_faces=None):
+    """Write binary STL.
+
+    Facets are assembled in a structured array and written with a
+    single call.  If chunk_faces is given, at most chunk_faces facets
+    are assembled at a time to limit memory use.  Per face attributes
+    are taken from m.face_attrs, or set to 0 if it is None.
+
+    """
     if m.normals is None:
         raise RuntimeError("Face normal not available in model")
     if hasattr(fname, 'write'):
         f_ctx = nullcontext(fname)
     else:
         f_ctx = open(fname, 'wb')
-    fvs = m.vertices[m.faces]  # vertices of faces
     if header.startswith(b"solid"):
         raise RuntimeError("Binary STL header cannot start with 'solid'")
     if len(header) > 80:
@@ -205,22 +313,30 @@ def write_binary_stl(m, fname, header=b"exported from py3do"):
     assert len(header) == 80
     n_faces = m.faces.shape[0]
     n_faces_b = pack("<L", n_faces)
-    attr_b = pack("<H", 0)
-    facet_str = Struct("<" + "f" * 12)
+    if chunk_faces is None:
+        chunk_faces = max(n_faces, 1)
     with f_ctx as f:
         f.write(header)
         f.write(n_faces_b)
-        for i, fv in enumerate(fvs.tolist()):
-            face_b = facet_str.pack(*m.normals[i], *fv[0], *fv[1], *fv[2])
-            f.write(face_b)
-            f.write(attr_b)
+        for i in range(0, n_faces, chunk_faces):
+            j = min(i + chunk_faces, n_faces)
+            d = np.empty(j - i, dtype=_facet_dtype)
+            d["normal"] = m.normals[i:j]
+            d["v"] = m.vertices[m.faces[i:j]]
+            if m.face_attrs is not None:
+                d["attr"] = m.face_attrs[i:j]
+            else:
+                d["attr"] = 0
+            f.write(d)
 
-def read_stl(fname, *, fix_nan_normals=False):
+def read_stl(fname, *, fix_nan_normals=False, mmap=False, dtype=np.float64):
     """Read binary or ascii STL.
 
     Type is automatically determined.  Setting fix_nan_normals=True
     allows for reading files with e.g. collinear triangles (sets their
-    normals to 0).
+    normals to 0).  mmap=True memory maps binary files (see
+    read_binary_stl), it is ignored for ASCII files.  dtype is the
+    floating point type of mesh vertices and normals.
     """
     # determine file type
     header = None
@@ -229,9 +345,69 @@ def read_stl(fname, *, fix_nan_normals=False):
     else:
         f_ctx = open(fname, 'rb')
     with f_ctx as f:
+        start = f.tell()
         header = _read_n_bytes(f, 6)
+        if f is fname:
+            f.seek(start)
     if header.lower() == b"solid ":
-        m = read_ascii_stl(fname, fix_nan_normals=fix_nan_normals)
+        m = read_ascii_stl(fname, fix_nan_normals=fix_nan_normals,
+                           dtype=dtype)
     else:
-        m = read_binary_stl(fname, fix_nan_normals=fix_nan_normals)
+        m = read_binary_stl(fname, fix_nan_normals=fix_nan_normals,
+                            mmap=mmap, dtype=dtype)
     return m
+
+def _iter_ascii_stl_chunks(fl, chunk_faces):
+    normals = []
+    fvs = []
+    for normal, v1, v2, v3 in _ascii_stl_facets(fl):
+        normals.append(normal)
+        fvs.append((v1, v2, v3))
+        if len(normals) == chunk_faces:
+            yield np.array(normals), np.array(fvs)
+            normals = []
+            fvs = []
+    if len(normals) > 0:
+        yield np.array(normals), np.array(fvs)
+def _iter_binary_stl_chunks(f, chunk_faces):
+    header = _read_n_bytes(f, 80)
+    n_faces_b = _read_n_bytes(f, 4)
+    n_faces = unpack("<L", n_faces_b)[0]
+    for i in range(0, n_faces, chunk_faces):
+        n_chunk = min(chunk_faces, n_faces - i)
+        buf = _read_n_bytes(f, _facet_dtype.itemsize * n_chunk)
+        d = np.frombuffer(buf, dtype=_facet_dtype, count=n_chunk)
+        yield d["normal"], d["v"]
+    if len(f.read(1)) != 0:
+        raise RuntimeError("Expected end of file")
+def iter_stl_chunks(fname, chunk_faces=1_000_000):
+    """Iterate over facets of binary or ascii STL in batches.
+
+    Yields pairs (normals, triangle_vertices) of arrays of shapes
+    n x 3 and n x 3 x 3 with n = chunk_faces except for the last
+    batch.  Vertices are not welded and no mesh is constructed, so
+    memory use does not depend on file size.  See
+    py3do.geom.stream_volume and related functions for reductions
+    over the batches.
+
+    """
+    if chunk_faces < 1:
+        raise ValueError("chunk_faces must be positive")
+    if hasattr(fname, 'read'):
+        f_ctx = nullcontext(fname)
+    else:
+        f_ctx = open(fname, 'rb')
+    with f_ctx as f:
+        pos = f.tell()
+        header = _read_n_bytes(f, 6)
+        f.seek(pos)
+        if isinstance(header, str):  # text file object
+            yield from _iter_ascii_stl_chunks(f, chunk_faces)
+        elif header.lower() == b"solid ":
+            fl = io.TextIOWrapper(f)
+            try:
+                yield from _iter_ascii_stl_chunks(fl, chunk_faces)
+            finally:
+                fl.detach()  # do not close f together with the wrapper
+        else:
+            yield from _iter_binary_stl_chunks(f, chunk_faces)
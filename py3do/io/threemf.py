@@ -0,0 +1,241 @@
+"""3MF file reader and writer.
+
+Only the core specification is supported: mesh objects, components
+and build items with their transforms.  Materials, colors and other
+extensions are ignored.
+
+"""
+
+import zipfile
+import xml.etree.ElementTree as ET
+from contextlib import nullcontext
+
+import numpy as np
+
+from .. import Mesh
+
+_CORE_NS = "http://schemas.microsoft.com/3dmanufacturing/core/2015/02"
+_RELS_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_MODEL_REL_TYPE = "http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel"
+_DEFAULT_MODEL = "3D/3dmodel.model"
+# length of 3MF units in millimeters
+_UNITS = {"micron": 1e-3, "millimeter": 1.0, "centimeter": 10.0,
+          "inch": 25.4, "foot": 304.8, "meter": 1000.0}
+
+def _local(tag):
+    """Tag name without namespace."""
+    return tag.rsplit("}", 1)[-1]
+
+def _parse_transform(s):
+    """Convert 3MF transform string to a 4x4 matrix acting on column
+    vectors."""
+    if s is None:
+        return None
+    v = np.array(s.split(), dtype=float)
+    if v.shape[0] != 12:
+        raise RuntimeError("3MF transform must have 12 numbers")
+    T = np.eye(4)
+    T[:3,:3] = v[:9].reshape(3, 3).T
+    T[:3,3] = v[9:]
+    return T
+
+def _format_transform(T):
+    """Convert a 4x4 (or 3x4) matrix acting on column vectors to a
+    3MF transform string."""
+    T = np.asarray(T, dtype=float)
+    vals = np.concatenate([T[:3,:3].T.ravel(), T[:3,3]])
+    return " ".join(repr(x) for x in vals.tolist())
+
+def _transform_mesh(vertices, faces, T):
+    """Apply affine transform T to vertices, flip faces of mirrored
+    meshes to keep their orientation."""
+    if T is None:
+        return vertices, faces
+    vertices = vertices @ T[:3,:3].T + T[:3,3]
+    if np.linalg.det(T[:3,:3]) < 0:
+        faces = faces[:,::-1]
+    return vertices, faces
+
+def _merge(parts):
+    """Concatenate a list of (vertices, faces) pairs."""
+    if len(parts) == 0:
+        return np.empty((0, 3)), np.empty((0, 3), dtype=np.intp)
+    offsets = np.cumsum([0] + [v.shape[0] for v, _ in parts[:-1]])
+    vertices = np.vstack([v for v, _ in parts])
+    faces = np.vstack([f + o for (_, f), o in zip(parts, offsets)])
+    return vertices, faces
+
+def _model_path(zf):
+    """Find the path of the 3D model part in the package."""
+    try:
+        rels = ET.fromstring(zf.read("_rels/.rels"))
+    except KeyError:
+        return _DEFAULT_MODEL
+    for rel in rels:
+        if rel.get("Type") == _MODEL_REL_TYPE:
+            return rel.get("Target").lstrip("/")
+    return _DEFAULT_MODEL
+
+def _parse_model(f):
+    """Stream parse a 3MF model part.
+
+    Returns a dict of objects, a list of build items and the length
+    of the model unit in millimeters.  Each object is a pair
+    (vertices, faces) or a list of (objectid, transform) components,
+    each build item a pair (objectid, transform).
+
+    """
+    objects = {}
+    items = []
+    obj_id = None
+    vs = []
+    ts = []
+    components = []
+    scale = 1.0
+    for event, el in ET.iterparse(f, events=("start", "end")):
+        tag = _local(el.tag)
+        if event == "start":
+            if tag == "model":
+                unit = el.get("unit", "millimeter")
+                if unit not in _UNITS:
+                    raise RuntimeError("Unknown 3MF unit: " + unit)
+                scale = _UNITS[unit]
+            elif tag == "object":
+                obj_id = el.get("id")
+                vs = []
+                ts = []
+                components = []
+            continue
+        if tag == "vertex":
+            vs.extend((el.get("x"), el.get("y"), el.get("z")))
+            el.clear()
+        elif tag == "triangle":
+            ts.extend((el.get("v1"), el.get("v2"), el.get("v3")))
+            el.clear()
+        elif tag in ("vertices", "triangles"):
+            el.clear()
+        elif tag == "component":
+            components.append((el.get("objectid"),
+                               _parse_transform(el.get("transform"))))
+        elif tag == "object":
+            if len(components) > 0:
+                objects[obj_id] = components
+            else:
+                vertices = np.array(vs, dtype=float).reshape(-1, 3)
+                faces = np.array(ts, dtype=np.intp).reshape(-1, 3)
+                objects[obj_id] = (vertices, faces)
+            vs = []
+            ts = []
+            el.clear()
+        elif tag == "item":
+            items.append((el.get("objectid"),
+                          _parse_transform(el.get("transform"))))
+    return objects, items, scale
+
+def _resolve_object(objects, obj_id, depth=0):
+    """Return (vertices, faces) of an object, flattening components."""
+    if depth > 100:
+        raise RuntimeError("3MF components nested too deep")
+    if obj_id not in objects:
+        raise RuntimeError("3MF object " + str(obj_id) + " not found")
+    obj = objects[obj_id]
+    if isinstance(obj, tuple):
+        return obj
+    parts = [_transform_mesh(*_resolve_object(objects, c_id, depth+1), T)
+             for c_id, T in obj]
+    return _merge(parts)
+
+def read_3mf(fname, *, fix_nan_normals=False, merge=False):
+    """Read a 3MF file.
+
+    Returns a list of meshes, one for each build item, with item
+    transforms applied.  Objects made of components are flattened into
+    a single mesh.  If merge is True all build items are combined into
+    a single mesh.  Coordinates are converted from the model unit to
+    millimeters.
+
+    The model XML is parsed incrementally and vertex and triangle
+    attributes are converted to arrays in bulk.
+
+    """
+    if hasattr(fname, 'read'):
+        f_ctx = nullcontext(fname)
+    else:
+        f_ctx = open(fname, 'rb')
+    with f_ctx as f, zipfile.ZipFile(f) as zf:
+        with zf.open(_model_path(zf)) as mf:
+            objects, items, scale = _parse_model(mf)
+    parts = [_transform_mesh(*_resolve_object(objects, obj_id), T)
+             for obj_id, T in items]
+    if scale != 1:
+        # transforms are in model units too, so scale the result
+        parts = [(v * scale, f) for v, f in parts]
+    if merge:
+        parts = [_merge(parts)]
+    return [Mesh(v, f, fix_nan_normals=fix_nan_normals) for v, f in parts]
+
+_content_types = """<?xml version="1.0" encoding="UTF-8"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="model" ContentType="application/vnd.ms-package.3dmanufacturing-3dmodel+xml"/>
+</Types>
+"""
+_rels = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+         '<Relationships xmlns="' + _RELS_NS + '">\n'
+         '<Relationship Target="/' + _DEFAULT_MODEL + '" Id="rel0" Type="'
+         + _MODEL_REL_TYPE + '"/>\n'
+         '</Relationships>\n')
+
+def write_3mf(meshes, fname, transforms=None, *, float_fmt="%r",
+              chunk_size=100_000):
+    """Write meshes to a 3MF file.
+
+    meshes is a Mesh or a list of meshes, each written as a separate
+    object with its own build item.  transforms is an optional list of
+    4x4 (or 3x4) affine matrices, one per mesh, stored as build item
+    transforms.  float_fmt is a %-style format used for vertex
+    coordinates.  Vertices and triangles are formatted in bulk in
+    chunks of chunk_size elements.
+
+    """
+    if isinstance(meshes, Mesh):
+        meshes = [meshes]
+    if transforms is None:
+        transforms = [None] * len(meshes)
+    if len(transforms) != len(meshes):
+        raise RuntimeError("write_3mf: number of transforms must match"
+                           " number of meshes")
+    v_template = "<vertex x=\"" + float_fmt + "\" y=\"" + float_fmt +\
+                 "\" z=\"" + float_fmt + "\"/>\n"
+    t_template = "<triangle v1=\"%d\" v2=\"%d\" v3=\"%d\"/>\n"
+    if hasattr(fname, 'write'):
+        f_ctx = nullcontext(fname)
+    else:
+        f_ctx = open(fname, 'wb')
+    with f_ctx as f, zipfile.ZipFile(f, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml", _content_types)
+        zf.writestr("_rels/.rels", _rels)
+        with zf.open(_DEFAULT_MODEL, "w") as mf:
+            mf.write(('<?xml version="1.0" encoding="UTF-8"?>\n'
+                      '<model unit="millimeter" xml:lang="en-US" xmlns="'
+                      + _CORE_NS + '">\n<resources>\n').encode())
+            for i, m in enumerate(meshes):
+                mf.write(('<object id="' + str(i + 1) + '" type="model">\n'
+                          '<mesh>\n<vertices>\n').encode())
+                for template, data, closing in [
+                        (v_template, m.vertices, "</vertices>\n<triangles>\n"),
+                        (t_template, m.faces, "</triangles>\n")]:
+                    n = data.shape[0]
+                    for j in range(0, n, chunk_size):
+                        k = min(j + chunk_size, n)
+                        mf.write(((template * (k - j)) %
+                                  tuple(data[j:k].ravel().tolist())).encode())
+                    mf.write(closing.encode())
+                mf.write("</mesh>\n</object>\n".encode())
+            mf.write("</resources>\n<build>\n".encode())
+            for i, T in enumerate(transforms):
+                item = '<item objectid="' + str(i + 1) + '"'
+                if T is not None:
+                    item += ' transform="' + _format_transform(T) + '"'
+                mf.write((item + "/>\n").encode())
+            mf.write("</build>\n</model>\n".encode())
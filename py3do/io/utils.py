@@ -1,16 +1,40 @@
 """Functions for generic mesh reading"""
 
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory, resource_tracker
+
+import numpy as np
+
+from .. import Mesh
 from .stl import read_stl
 from .obj import read_obj
+from .ply import read_ply
+from .native import read_native
+from .threemf import read_3mf
 
-def read_mesh(fname, *, fix_nan_normals=False):
+def read_mesh(fname, *, fix_nan_normals=False, cache=None):
     """Detect mesh type and read it.
 
-    Currently STL and OBJ files are handled.  OBJ vs STL are
-    recognized based on file extension, binary vs ASCII STLs based on
-    content.
+    Currently STL, OBJ, PLY, 3MF and native py3do (.p3d) files are
+    handled.  File types are recognized based on file extension,
+    binary vs ASCII STLs based on content.  All build items of 3MF
+    files are merged into a single mesh, use read_3mf to get them
+    separately.
+
+    cache is an optional MeshCache.  If given, meshes read from file
+    names are stored in it and later loaded from it instead of parsing
+    the file again.
 
     """
+    if cache is not None and not hasattr(fname, 'read'):
+        key = cache.key(fname, fix_nan_normals=fix_nan_normals)
+        m = cache.get(key)
+        if m is None:
+            m = read_mesh(fname, fix_nan_normals=fix_nan_normals)
+            cache.put(key, m)
+        return m
     if hasattr(fname, 'read'):
         # this is a file object
         name = fname.name
@@ -21,4 +45,104 @@ def read_mesh(fname, *, fix_nan_normals=False):
         return read_stl(fname, fix_nan_normals=fix_nan_normals)
     elif name.endswith(".obj"):
         return read_obj(fname, fix_nan_normals=fix_nan_normals)
+    elif name.endswith(".ply"):
+        return read_ply(fname, fix_nan_normals=fix_nan_normals)
+    elif name.endswith(".3mf"):
+        return read_3mf(fname, fix_nan_normals=fix_nan_normals,
+                        merge=True)[0]
+    elif name.endswith(".p3d"):
+        return read_native(fname)
     raise RuntimeError("read_mesh: unrecognized file type")
+
+ReadResult = namedtuple("ReadResult", ["path", "mesh", "error", "seconds"])
+
+_shared_arrays = ["vertices", "faces", "normals", "face_attrs"]
+def _read_mesh_timed(fname, fix_nan_normals):
+    t0 = time.perf_counter()
+    try:
+        m = read_mesh(fname, fix_nan_normals=fix_nan_normals)
+        error = None
+    except Exception as e:
+        m = None
+        error = e
+    return m, error, time.perf_counter() - t0
+def _read_mesh_to_shm(fname, fix_nan_normals):
+    """Read a mesh in a worker process and put its arrays in a shared
+    memory block.
+
+    Returns the block name, a list of (name, dtype, shape, offset) of
+    the stored arrays, an error and reading time."""
+    m, error, t = _read_mesh_timed(fname, fix_nan_normals)
+    if m is None:
+        return None, None, error, t
+    arrays = [(name, np.ascontiguousarray(getattr(m, name)))
+              for name in _shared_arrays if getattr(m, name) is not None]
+    layout = []
+    offset = 0
+    for name, a in arrays:
+        layout.append((name, a.dtype.str, a.shape, offset))
+        offset += (a.nbytes + 63) // 64 * 64
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for (name, a), (_, _, _, o) in zip(arrays, layout):
+        np.ndarray(a.shape, a.dtype, buffer=shm.buf, offset=o)[...] = a
+    shm.close()  # the block is unlinked by the parent process
+    return shm.name, layout, error, t
+def _mesh_from_shm(shm_name, layout):
+    """Copy mesh arrays out of a shared memory block and free it."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        arrays = {name: np.ndarray(shape, dtype, buffer=shm.buf,
+                                   offset=o).copy()
+                  for name, dtype, shape, o in layout}
+    finally:
+        shm.close()
+        shm.unlink()
+    # already validated in the worker process
+    return Mesh(arrays["vertices"], arrays["faces"], arrays["normals"],
+                face_attrs=arrays.get("face_attrs"), validate=False,
+                dtype=arrays["vertices"].dtype)
+
+def read_meshes(paths, *, workers=None, executor="process",
+                fix_nan_normals=False):
+    """Read many mesh files concurrently with read_mesh.
+
+    executor is either "process" or "thread".  With processes, mesh
+    arrays are passed back to the calling process through shared
+    memory instead of being pickled.  workers is the number of
+    workers, by default the number of CPUs.
+
+    Returns a list of ReadResult(path, mesh, error, seconds) tuples in
+    the order of paths.  Files which failed to load have mesh set to
+    None and error set to the raised exception, other files are read
+    regardless.  seconds is the time spent reading the file in the
+    worker.
+
+    """
+    paths = list(paths)
+    if executor == "process":
+        # workers must share our resource tracker, which otherwise
+        # reports shared memory blocks unlinked here as leaked
+        resource_tracker.ensure_running()
+        pool = ProcessPoolExecutor(max_workers=workers)
+        read_fn = _read_mesh_to_shm
+    elif executor == "thread":
+        pool = ThreadPoolExecutor(max_workers=workers)
+        read_fn = _read_mesh_timed
+    else:
+        raise ValueError("executor must be 'process' or 'thread'")
+    results = []
+    with pool:
+        futures = [pool.submit(read_fn, p, fix_nan_normals) for p in paths]
+        for p, fut in zip(paths, futures):
+            try:
+                if executor == "process":
+                    shm_name, layout, error, t = fut.result()
+                    m = None
+                    if shm_name is not None:
+                        m = _mesh_from_shm(shm_name, layout)
+                else:
+                    m, error, t = fut.result()
+            except Exception as e:  # e.g. a crashed worker process
+                m, error, t = None, e, None
+            results.append(ReadResult(p, m, error, t))
+    return results
@@ -3,20 +3,29 @@
 import copy
 
 import numpy as np
+from scipy.spatial import cKDTree
+from scipy.sparse import coo_array
+from scipy.sparse.csgraph import connected_components as graph_components
 
-from .geom import normals_cross
+from .geom import normals_cross, vertex_normals
+from .geom import affine_parts, transform_points
+from .topo import sorted_edges, EdgeToFaceMap, repeated_face_vertices
+from .topo import vertex_face_adjacency, vertex_vertex_adjacency
+from .topo import face_face_adjacency
+from .utils import unique_points, renumber_by_first
 
-def _as_3col(x, *, fl=True):
+def _as_3col(x, *, fl=True, dtype=None):
     """Convert x to 3 column array.
 
-    Works for empty lists"""
+    dtype defaults to double for floats and to the type of x for
+    integers.  Works for empty lists"""
     if len(x) == 0:
-        return np.empty((0,3), dtype=np.double if fl else np.uint)
-    if fl:
-        x = np.asarray(x, dtype=float)
-    else:
-        x = np.asarray(x)
-    return np.asarray(x)
+        if dtype is None:
+            dtype = np.double if fl else np.uint
+        return np.empty((0,3), dtype=dtype)
+    if fl and dtype is None:
+        dtype = float
+    return np.asarray(x, dtype=dtype)
 def _check_points_array(x, name):
     """Make sure x is a 3 column matrix.
 
@@ -28,24 +37,175 @@ def _check_points_array(x, name):
     if not np.isfinite(x).all():
         raise RuntimeError("Inf or Nan in " + name)
 
+def _read_only(x):
+    """Make cached arrays read only so they cannot be modified by
+    accident."""
+    if isinstance(x, np.ndarray):
+        x.flags.writeable = False
+    elif isinstance(x, tuple):
+        for a in x:
+            _read_only(a)
+    return x
+def _cached_property(compute):
+    """Property computed on first access and kept until the mesh is
+    modified."""
+    name = compute.__name__
+    def get(self):
+        if name not in self._cache:
+            self._cache[name] = _read_only(compute(self))
+        return self._cache[name]
+    return property(get, doc=compute.__doc__)
+
 class Mesh:
     def __init__(self, vertices, faces, /, normals=None, *,
-                 fix_nan_normals=False):
+                 fix_nan_normals=False, face_attrs=None, validate=True,
+                 dtype=np.float64, index_dtype=None, compute_normals=True):
         """Create a mesh.
 
         Setting fix_nan_normals=True replaces Nan's in normals with
         zeros.  Useful for meshes with bad normals, e.g. collinear
         triangles.
+
+        face_attrs is an optional array of 16 bit attributes of each
+        face, written to binary STL files.
+
+        validate=False skips check_faces_and_vertices, use only for
+        trusted data, e.g. produced by py3do itself.
+
+        dtype is the floating point type of vertices and normals,
+        np.float32 halves memory use and keeps the precision of STL
+        files.  index_dtype is the integer type of faces, e.g.
+        np.int32, by default the type of faces is kept.  If normals
+        are not given and compute_normals is "lazy", they are computed
+        on first access instead of in the constructor; validation then
+        skips them.
+
+        Derived properties (face_normals, face_areas, edges,
+        edge_to_face_map, vertex_faces, vertex_vertices, face_faces,
+        vertex_normals, bounds) are computed on first access and
+        cached.  The cache is cleared when vertices, faces or normals
+        are assigned or modified by Mesh methods.  Call invalidate()
+        after modifying the arrays in place directly.
         """
-        self.vertices = _as_3col(vertices, fl=True)
-        self.faces = _as_3col(faces, fl=False)
+        self._cache = {}
+        self.version = 0
+        self._fix_nan_normals = fix_nan_normals
+        self.vertices = _as_3col(vertices, fl=True, dtype=dtype)
+        self.faces = _as_3col(faces, fl=False, dtype=index_dtype)
         if normals is not None:
-            self.normals = _as_3col(normals, fl=True)
+            self.normals = _as_3col(normals, fl=True, dtype=dtype)
+            if fix_nan_normals:
+                self.normals[np.isnan(self.normals)] = 0
+        elif compute_normals == "lazy":
+            self.normals = None
+        elif compute_normals:
+            self._update_normals()
         else:
-            self.normals, _ = normals_cross(self)
-        if fix_nan_normals:
-            self.normals[np.isnan(self.normals)] = 0
-        self.check_faces_and_vertices()
+            raise RuntimeError("compute_normals must be True or 'lazy'")
+        if face_attrs is not None:
+            face_attrs = np.asarray(face_attrs, dtype=np.uint16)
+        self.face_attrs = face_attrs
+        if validate:
+            self.check_faces_and_vertices()
+    @property
+    def vertices(self):
+        return self._vertices
+    @vertices.setter
+    def vertices(self, v):
+        self._vertices = v
+        self.invalidate()
+    @property
+    def faces(self):
+        return self._faces
+    @faces.setter
+    def faces(self, f):
+        self._faces = f
+        self.invalidate()
+    @property
+    def normals(self):
+        if self._normals is None:
+            # lazy normals, computing them does not change the mesh
+            self._normals = self._compute_normals()
+        return self._normals
+    @normals.setter
+    def normals(self, n):
+        self._normals = n
+        self.invalidate()
+    def invalidate(self):
+        """Clear cached derived properties.
+
+        Needed only after modifying vertices, faces or normals arrays
+        in place outside of Mesh methods.  version is incremented on
+        every call, so external caches can detect changes."""
+        self._cache.clear()
+        self.version += 1
+    def _cache_face_geometry(self):
+        """Cache face normals and areas from a single normals_cross
+        call."""
+        normals, areas = normals_cross(self)
+        self._cache["face_normals"] = _read_only(normals)
+        self._cache["face_areas"] = _read_only(areas)
+    def _compute_normals(self):
+        """Compute normals, cache face normals and areas computed with
+        them."""
+        self._cache_face_geometry()
+        normals = self._cache["face_normals"].copy()
+        if self._fix_nan_normals:
+            normals[np.isnan(normals)] = 0
+        return normals
+    def _update_normals(self):
+        """Recompute normals."""
+        self.invalidate()
+        self._normals = self._compute_normals()
+
+    @property
+    def face_normals(self):
+        """Face normals computed from vertices.
+
+        Unlike normals, never taken from a file."""
+        if "face_normals" not in self._cache:
+            self._cache_face_geometry()
+        return self._cache["face_normals"]
+    @property
+    def face_areas(self):
+        """Areas of faces."""
+        if "face_areas" not in self._cache:
+            self._cache_face_geometry()
+        return self._cache["face_areas"]
+    @_cached_property
+    def edges(self):
+        """Unique edges as sorted pairs of vertex numbers."""
+        return sorted_edges(self, unique=True)
+    @_cached_property
+    def edge_to_face_map(self):
+        """EdgeToFaceMap of the mesh."""
+        return EdgeToFaceMap(self)
+    @_cached_property
+    def vertex_faces(self):
+        """Faces containing each vertex as (indptr, indices), see
+        topo.vertex_face_adjacency."""
+        return vertex_face_adjacency(self)
+    @_cached_property
+    def vertex_vertices(self):
+        """Neighbors of each vertex as (indptr, indices), see
+        topo.vertex_vertex_adjacency."""
+        return vertex_vertex_adjacency(self)
+    @_cached_property
+    def face_faces(self):
+        """Faces sharing an edge with each face as (indptr, indices),
+        see topo.face_face_adjacency."""
+        return face_face_adjacency(self, self.edge_to_face_map)
+    @_cached_property
+    def vertex_normals(self):
+        """Angle weighted, normalized vertex normals."""
+        return vertex_normals(self, method="angle weighted")
+    @_cached_property
+    def bounds(self):
+        """Bounding box as a 2 x 3 array of minimum and maximum
+        coordinates."""
+        return np.vstack([self.vertices.min(axis=0),
+                          self.vertices.max(axis=0)])
+
     def check_faces_and_vertices(self):
         """Basic checks of consistency of faces and vertices."""
         _check_points_array(self.vertices, "vertices")
@@ -61,7 +221,11 @@ class Mesh:
         n_vert = self.vertices.shape[0]
         if (self.faces >= n_vert).any():
             raise RuntimeError("faces indices out of bounds")
-        _check_points_array(self.normals, "normals")
+        if self._normals is not None:
+            _check_points_array(self.normals, "normals")
+        if self.face_attrs is not None:
+            if self.face_attrs.shape != (self.faces.shape[0],):
+                raise RuntimeError("face_attrs must have one entry per face")
 
     def clone(self):
         return copy.deepcopy(self)
@@ -69,22 +233,59 @@ class Mesh:
     def round_coords(self, decimals, *, inplace=False, merge=False):
         """Round coordinates of all points.
 
-        merge identical points if requested."""
-        if merge:
-            raise NotImplementedError("round_coords: Merging is not implemented")
+        merge identical points if requested (see merge_vertices)."""
         if inplace:
             np.around(self.vertices, decimals, out=self.vertices)
-            if self.normals is not None:
-                self.normals, _ = normals_cross(self)
-            return None
-        return Mesh(np.around(self.vertices, decimals),
-                    self.faces, self.normals)
+            self._update_normals()
+            m = self
+        else:
+            m = Mesh(np.around(self.vertices, decimals),
+                     self.faces, self.normals, face_attrs=self.face_attrs,
+                     dtype=self.vertices.dtype)
+        if merge:
+            m.merge_vertices()
+        return None if inplace else m
+
+    def merge_vertices(self, tol=0):
+        """Merge vertices closer than tol in place.
+
+        Vertices connected by chains of pairs at most tol apart are
+        replaced by the first of them.  Faces which become degenerate
+        are removed, remaining faces keep their normals and
+        attributes.  Exact duplicates are found by sorting, close pairs
+        with a KD-tree, so the cost is O(n log n) for n vertices.
+
+        Returns the vertex map: an array giving the new number of
+        each original vertex.
+
+        """
+        # exact duplicates are merged by sorting, which is cheaper and
+        # leaves fewer points for the KD-tree
+        vertices, vertex_map = unique_points(self.vertices)
+        if tol > 0:
+            n = vertices.shape[0]
+            pairs = cKDTree(vertices).query_pairs(tol, output_type="ndarray")
+            g = coo_array((np.ones(pairs.shape[0], dtype=bool),
+                           (pairs[:,0], pairs[:,1])), shape=(n, n))
+            nc, labels = graph_components(g, directed=False)
+            # number merged vertices in order of first occurrence
+            labels, first = renumber_by_first(labels, nc)
+            vertex_map = labels[vertex_map]
+            vertices = vertices[first]
+        self.vertices = vertices
+        self.faces = vertex_map[self.faces].astype(self.faces.dtype)
+        f_mask = np.full(self.faces.shape[0], True)
+        f_mask[repeated_face_vertices(self)] = False
+        if not f_mask.all():
+            self.faces = self.faces[f_mask]
+            self.normals = self.normals[f_mask]
+            if self.face_attrs is not None:
+                self.face_attrs = self.face_attrs[f_mask]
+        return vertex_map
 
     def extents(self):
         """Size of the bounding box."""
-        M = self.vertices.max(axis=0)
-        m = self.vertices.min(axis=0)
-        return M - m
+        return self.bounds[1] - self.bounds[0]
 
     def delete_edge(self, i, j):
         """Delete an edge i--j.
@@ -98,7 +299,10 @@ class Mesh:
         f_mask = ~(i_mask & j_mask)
         self.faces = self.faces[f_mask]
         self.normals = self.normals[f_mask]
+        if self.face_attrs is not None:
+            self.face_attrs = self.face_attrs[f_mask]
         self.faces[self.faces == i] = j
+        self.invalidate()
 
     def delete_vertices(self, vs):
         """Delete vertices with given numbers.
@@ -109,6 +313,8 @@ class Mesh:
         f_mask = ~np.isin(self.faces, vs).any(axis=1)
         self.faces = self.faces[f_mask]
         self.normals = self.normals[f_mask]
+        if self.face_attrs is not None:
+            self.face_attrs = self.face_attrs[f_mask]
         # renumber vertices
         old_n = self.vertices.shape[0]
         v_mask = np.full(old_n, True)
@@ -126,14 +332,55 @@ class Mesh:
         rotates first around the X axis, then around the Y axis.
 
         """
+        R = np.eye(3)
         for axis in rotations.upper():
             ai = "XYZ".find(axis)
             if ai < 0:
                 raise ValueError("Error: rotations argument must be a string of XYZxyz")
             a0 = 1 if ai == 0 else 0
             a1 = 1 if ai == 2 else 2
-            self.vertices[:,(a0,a1)] = self.vertices[:,(a1,a0)]
-            self.vertices[:,a1] = -self.vertices[:,a1]
+            Ri = np.zeros((3, 3))
+            Ri[ai,ai] = 1
+            Ri[a0,a1] = 1
+            Ri[a1,a0] = -1
+            R = Ri @ R
+        # products with signed permutation matrices are exact
+        self.transform(np.column_stack([R, np.zeros(3)]))
+
+    def transform(self, T, *, inplace=True):
+        """Apply affine transform T to the mesh.
+
+        T is a 3x4 or 4x4 matrix acting on column vectors.  Vertices
+        are updated in place with a single matrix product, normals are
+        multiplied by the inverse transpose of the linear part and
+        renormalized.  Faces of mirrored meshes are flipped to keep
+        their orientation.  If inplace is False a transformed copy is
+        returned.
+
+        """
+        if not inplace:
+            m = self.clone()
+            m.transform(T)
+            return m
+        A, t = affine_parts(T)
+        dt = self.vertices.dtype
+        np.matmul(self.vertices, A.T.astype(dt), out=self.vertices)
+        self.vertices += t.astype(dt)
+        if self._normals is not None:
+            n = self._normals @ np.linalg.inv(A).astype(self._normals.dtype)
+            l = np.linalg.norm(n, axis=1, keepdims=True)
+            np.divide(n, l, out=self._normals, where=(l > 0))
+        if np.linalg.det(A) < 0:
+            self.faces = self.faces[:,::-1]
+        self.invalidate()
+        return None
+
+    def transform_batch(self, Ts):
+        """Vertices of the mesh transformed by each of N affine
+        matrices Ts (see transform), as an N x n_vertices x 3 array.
+
+        The mesh itself is not changed."""
+        return transform_points(self.vertices, Ts)
 
     def get_submesh(self, vertex_mask):
         """Return a submesh formed of vertices selected with
@@ -157,11 +404,16 @@ class Mesh:
         # only include faces for which all vertices are present
         faces_mask = np.all(submesh_faces > -1, axis=1)
         submesh_faces = submesh_faces[faces_mask]
+        if self.face_attrs is not None:
+            face_attrs = self.face_attrs[faces_mask]
+        else:
+            face_attrs = None
         submesh = Mesh(self.vertices[vertex_mask], submesh_faces,
-                       normals=self.normals[faces_mask])
+                       normals=self.normals[faces_mask],
+                       face_attrs=face_attrs, dtype=self.vertices.dtype)
         return submesh, map_submesh_mesh
 
     def set_submesh_vertices(self, submesh, map_submesh_mesh):
         self.vertices[map_submesh_mesh] = submesh.vertices
         # recompute normals
-        self.normals, _ = normals_cross(self)
+        self._update_normals()
@@ -2,9 +2,11 @@
 
 import numpy as np
 
+import mapbox_earcut
+
 from .mesh import Mesh
-from .geom import vec_angle, vertex_normals
-from .topo import connected_components
+from .geom import vec_angle
+from .topo import connected_components, boundary_loops
 from .slice import slice_horiz_0
 
 def split_mesh(m):
@@ -23,9 +25,15 @@ def split_mesh(m):
         face_vertex_map[cv] = np.arange(len(cv))
     component_meshes = []
     for i in range(nc):
+        if m.face_attrs is not None:
+            face_attrs = m.face_attrs[component_faces[i]]
+        else:
+            face_attrs = None
         mi = Mesh(m.vertices[component_vertices[i]],
                   face_vertex_map[m.faces[component_faces[i]]],
-                  normals = m.normals[component_faces[i]]
+                  normals = m.normals[component_faces[i]],
+                  face_attrs = face_attrs,
+                  dtype = m.vertices.dtype
                   )
         component_meshes.append(mi)
     return component_meshes
@@ -55,10 +63,11 @@ def chamfer_bottom(m, h, d=None, min_angle=15):
     min_z = m.vertices[:,2].min()
     m.vertices[:,2] -= min_z
     m.vertices[:,2] -= h
+    m.invalidate()
 
     m = slice_horiz_0(m, keep="both")
     mask = (m.vertices[:,2] < 0)
-    v_normals = vertex_normals(m, method="angle weighted")[mask]
+    v_normals = m.vertex_normals[mask]
     angles_to_z = vec_angle([0,0,1], v_normals)
     mask2 = (angles_to_z > min_angle)
     mask[mask] = mask2
@@ -71,4 +80,72 @@ def chamfer_bottom(m, h, d=None, min_angle=15):
 
     m.vertices[:,2] += h
     m.vertices[:,2] += min_z
+    m.invalidate()
     return m
+
+def _triangulate_loop(vertices, loop):
+    """Triangulate a closed loop of vertex numbers.
+
+    The loop is projected on the plane given by its Newell normal and
+    triangulated with mapbox_earcut, triangles follow the orientation
+    of the loop.  Falls back to a fan triangulation if projection
+    fails, e.g. for strongly non-planar loops."""
+    k = loop.shape[0]
+    fan = np.column_stack([np.zeros(k - 2, dtype=np.intp),
+                           np.arange(1, k - 1), np.arange(2, k)])
+    p = vertices[loop]
+    p = p - p.mean(axis=0)
+    nrm = np.cross(p, np.roll(p, -1, axis=0)).sum(axis=0)
+    l = np.linalg.norm(nrm)
+    if l == 0:
+        return loop[fan]
+    nrm /= l
+    u = np.cross(nrm, np.eye(3)[np.argmin(np.abs(nrm))])
+    u /= np.linalg.norm(u)
+    v = np.cross(nrm, u)
+    p2 = np.column_stack([p @ u, p @ v])
+    tri = mapbox_earcut.triangulate_float64(p2, [k])
+    if tri.shape[0] != 3 * (k - 2):
+        return loop[fan]
+    tri = tri.reshape(-1, 3)
+    # loop is counterclockwise in (u, v), make triangles so as well
+    d1 = p2[tri[:,1]] - p2[tri[:,0]]
+    d2 = p2[tri[:,2]] - p2[tri[:,0]]
+    cw = (d1[:,0] * d2[:,1] - d1[:,1] * d2[:,0] < 0)
+    tri[cw] = tri[cw][:,::-1]
+    return loop[tri]
+
+def fill_holes(m, max_edges=None):
+    """Fill holes of mesh m.
+
+    Each boundary loop (see topo.boundary_loops) with at most
+    max_edges edges is triangulated with faces oriented consistently
+    with their neighbors.  Triangular holes are filled in bulk, larger
+    ones are projected on their best fitting plane and triangulated
+    with mapbox_earcut, with a fan triangulation as a fallback for
+    loops which do not project to a simple polygon.
+
+    Returns a new mesh, new faces get face attribute 0.
+
+    """
+    loops = boundary_loops(m, m.edge_to_face_map)
+    if max_edges is not None:
+        loops = [l for l in loops if l.shape[0] <= max_edges]
+    # fill faces run against boundary edges
+    tris = [l[::-1] for l in loops if l.shape[0] == 3]
+    new_faces = [np.array(tris, dtype=np.intp).reshape(-1, 3)]
+    for l in loops:
+        if l.shape[0] > 3:
+            new_faces.append(_triangulate_loop(m.vertices, l[::-1]))
+    new_faces = np.vstack(new_faces)
+    fvs = m.vertices[new_faces]
+    new_normals = np.cross(fvs[:,1] - fvs[:,0], fvs[:,2] - fvs[:,0])
+    l = np.linalg.norm(new_normals, axis=1, keepdims=True)
+    np.divide(new_normals, l, out=new_normals, where=(l > 0))
+    face_attrs = m.face_attrs
+    if face_attrs is not None:
+        face_attrs = np.concatenate([face_attrs,
+                        np.zeros(new_faces.shape[0], dtype=np.uint16)])
+    return Mesh(m.vertices.copy(), np.vstack([m.faces, new_faces]),
+                np.vstack([m.normals, new_normals]), face_attrs=face_attrs,
+                dtype=m.vertices.dtype)
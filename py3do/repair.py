@@ -0,0 +1,209 @@
+"""Repair mesh topology.
+
+All functions return a new mesh with its own arrays, the original
+mesh is not modified.
+
+"""
+
+import numpy as np
+from scipy.sparse import coo_array
+from scipy.sparse.csgraph import connected_components as graph_components
+
+from .mesh import Mesh
+from .topo import repeated_face_vertices
+from .utils import pairs_to_csr, csr_select, renumber_by_first
+
+def _select_faces(m, mask, vertices=None, faces=None, normals=None):
+    """New mesh with faces of m selected by Boolean mask, optionally
+    with new vertices, faces or normals.  Vertices of m are copied, so
+    the new mesh can be modified in place."""
+    if vertices is None:
+        vertices = m.vertices.copy()
+    if faces is None:
+        faces = m.faces
+    if normals is None:
+        normals = m.normals
+    face_attrs = m.face_attrs
+    if face_attrs is not None:
+        face_attrs = face_attrs[mask]
+    return Mesh(vertices, faces[mask], normals[mask],
+                face_attrs=face_attrs, validate=False,
+                dtype=m.vertices.dtype)
+
+def _manifold_face_pairs(efm):
+    """Pairs of faces sharing edges with exactly two faces.
+
+    Returns arrays of the two faces and a Boolean array which is True
+    if the edge has the same direction in both faces, i.e. the faces
+    are inconsistently oriented."""
+    ptr = efm.unique_edges_ptr[efm.face_counts == 2]
+    fa = efm.edges_rec["face"][ptr].astype(np.intp)
+    fb = efm.edges_rec["face"][ptr + 1].astype(np.intp)
+    same_dir = (efm.orientations[ptr] == efm.orientations[ptr + 1])
+    return fa, fb, same_dir
+
+def remove_degenerate_faces(m, min_area=None):
+    """Remove faces with repeated vertices.
+
+    If min_area is given faces with area not exceeding it are also
+    removed.  Returns the new mesh and indices of removed faces."""
+    mask = np.ones(m.faces.shape[0], dtype=bool)
+    mask[repeated_face_vertices(m)] = False
+    if min_area is not None:
+        mask &= (m.face_areas > min_area)
+    return _select_faces(m, mask), np.flatnonzero(~mask)
+
+def remove_duplicate_faces(m):
+    """Remove faces with the same vertices as an earlier face,
+    regardless of their order and orientation.
+
+    Returns the new mesh and indices of removed faces."""
+    s = np.sort(m.faces, axis=1)
+    order = np.lexsort((s[:,2], s[:,1], s[:,0]))
+    s = s[order]
+    dup = np.zeros(s.shape[0], dtype=bool)
+    dup[1:] = (s[1:] == s[:-1]).all(axis=1)
+    mask = np.ones(m.faces.shape[0], dtype=bool)
+    mask[order[dup]] = False
+    return _select_faces(m, mask), np.flatnonzero(~mask)
+
+def split_nonmanifold(m):
+    """Split non-manifold edges and vertices.
+
+    Corners of faces at a vertex are grouped into fans connected
+    through edges with exactly two faces, each fan gets its own copy
+    of the vertex.  The first fan of a vertex keeps its number,
+    copies are appended at the end.  Vertices joining several fans
+    (e.g. tips of two cones) are thus duplicated.  Faces of an edge
+    with more than two faces keep sharing it as long as their fans
+    around both end vertices are connected, e.g. for a fin attached
+    to a closed surface the surface stays closed and only the fin
+    gets new end vertices.  Where all faces of such an edge have
+    separate fans, it becomes a boundary edge of each of them.
+
+    Returns the new mesh and an array mapping its vertices to
+    vertices of m.
+
+    """
+    n = m.vertices.shape[0]
+    n_f = m.faces.shape[0]
+    fv = m.faces.ravel().astype(np.intp)
+    efm = m.edge_to_face_map
+    fa, fb, _ = _manifold_face_pairs(efm)
+    ptr = efm.unique_edges_ptr[efm.face_counts == 2]
+    links = [[], []]
+    for v in (efm.edges_rec["i"][ptr], efm.edges_rec["j"][ptr]):
+        ka = np.argmax(m.faces[fa] == v.reshape(-1,1), axis=1)
+        kb = np.argmax(m.faces[fb] == v.reshape(-1,1), axis=1)
+        links[0].append(3 * fa + ka)
+        links[1].append(3 * fb + kb)
+    rows = np.concatenate(links[0])
+    cols = np.concatenate(links[1])
+    g = coo_array((np.ones(rows.shape[0], dtype=bool), (rows, cols)),
+                  shape=(3 * n_f, 3 * n_f))
+    nc, labels = graph_components(g, directed=False)
+    # number fans: first fan of each vertex keeps the vertex number
+    labels, first = renumber_by_first(labels, nc)
+    fan_vertex = fv[first]
+    order = np.lexsort((first, fan_vertex))
+    is_copy = np.zeros(nc, dtype=bool)
+    is_copy[order[1:]] = (fan_vertex[order[1:]] == fan_vertex[order[:-1]])
+    copies = order[is_copy[order]]
+    new_index = fan_vertex.copy()
+    new_index[copies] = n + np.arange(copies.shape[0])
+    vertex_map = np.concatenate([np.arange(n), fan_vertex[copies]])
+    faces = new_index[labels].reshape(-1, 3).astype(m.faces.dtype)
+    vertices = m.vertices[vertex_map] if copies.shape[0] > 0 else None
+    all_faces = np.ones(n_f, dtype=bool)
+    return (_select_faces(m, all_faces, vertices=vertices, faces=faces),
+            vertex_map)
+
+def orient_faces(m, outward=True):
+    """Consistently orient faces of m.
+
+    Faces are reached by breadth first search over edges with exactly
+    two faces, started simultaneously from the lowest face of each
+    component.  Each step expands the whole frontier with array
+    operations, a face reached through an edge running in the same
+    direction as in its neighbor is flipped.  Non-orientable surfaces
+    keep some misoriented edges.
+
+    If outward is True closed components with negative volume are
+    flipped as a whole, so that their normals point outwards.
+
+    Returns the new mesh and a Boolean array of flipped faces.
+
+    """
+    n_f = m.faces.shape[0]
+    efm = m.edge_to_face_map
+    fa, fb, same_dir = _manifold_face_pairs(efm)
+    g = coo_array((np.ones(fa.shape[0], dtype=bool), (fa, fb)),
+                  shape=(n_f, n_f))
+    nc, labels = graph_components(g, directed=False)
+    flip = np.zeros(n_f, dtype=bool)
+    # no search needed if faces are already consistent
+    if same_dir.any():
+        rows = np.concatenate([fa, fb])
+        cols = np.concatenate([fb, fa])
+        rel = np.concatenate([same_dir, same_dir])
+        indptr, pair_idx = pairs_to_csr(rows, np.arange(rows.shape[0]), n_f)
+        frontier = renumber_by_first(labels, nc)[1]
+        visited = np.zeros(n_f, dtype=bool)
+        visited[frontier] = True
+        while frontier.shape[0] > 0:
+            sub_indptr, idx = csr_select(indptr, pair_idx, frontier)
+            src = np.repeat(frontier, np.diff(sub_indptr))
+            dst = cols[idx]
+            new = ~visited[dst]
+            src, dst, r = src[new], dst[new], rel[idx][new]
+            # faces reached from several frontier faces take the first
+            # assignment
+            order = np.argsort(dst, kind="stable")
+            dst = dst[order]
+            first = np.ones(dst.shape[0], dtype=bool)
+            first[1:] = (dst[1:] != dst[:-1])
+            frontier = dst[first]
+            flip[frontier] = (flip[src] ^ r)[order[first]]
+            visited[frontier] = True
+    if outward:
+        # closed components have no boundary edges
+        ptr = efm.unique_edges_ptr[efm.face_counts != 2]
+        open_comp = np.zeros(nc, dtype=bool)
+        open_comp[labels[efm.edges_rec["face"][ptr]]] = True
+        v = m.vertices[m.faces]
+        vol = np.einsum("ij,ij->i", v[:,0], np.cross(v[:,1], v[:,2]))
+        vol[flip] = -vol[flip]
+        comp_vol = np.bincount(labels, weights=vol, minlength=nc)
+        flip ^= ((comp_vol < 0) & ~open_comp)[labels]
+    faces = m.faces.copy()
+    faces[flip] = faces[flip][:,::-1]
+    normals = m.normals.copy()
+    normals[flip] *= -1
+    return _select_faces(m, np.ones(n_f, dtype=bool), faces=faces,
+                         normals=normals), flip
+
+def repair_mesh(m, *, min_area=None, outward=True):
+    """Repair mesh topology.
+
+    Removes degenerate and duplicate faces, splits non-manifold edges
+    and vertices and orients faces consistently (see respective
+    functions).  Returns the new mesh and a dict reporting numbers of
+    removed degenerate and duplicate faces, added vertex copies and
+    flipped faces, and manifold, oriented and watertight flags of the
+    result.
+
+    """
+    n = m.vertices.shape[0]
+    m, degenerate = remove_degenerate_faces(m, min_area)
+    m, duplicate = remove_duplicate_faces(m)
+    m, vertex_map = split_nonmanifold(m)
+    m, flip = orient_faces(m, outward)
+    efm = m.edge_to_face_map
+    report = {"degenerate_faces": degenerate.shape[0],
+              "duplicate_faces": duplicate.shape[0],
+              "split_vertices": vertex_map.shape[0] - n,
+              "flipped_faces": int(flip.sum()),
+              "manifold": bool(efm.manifold),
+              "oriented": bool(efm.oriented),
+              "watertight": bool(efm.watertight)}
+    return m, report
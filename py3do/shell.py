@@ -4,6 +4,7 @@ import numpy as np
 
 from .mesh import Mesh
 from .geom import vertex_normals
+from .utils import scatter_min
 
 def check_offset(m, v_disp):
     """Computes accuracy of offset based on diplacing estisting mesh
@@ -46,17 +47,17 @@ def offset_mesh(m, d, *, method="vertex normals", return_true_offsets=False,
         # ensure every face is offset by at least d
         true_offsets = check_offset(m, vn)
         # different offset scaling for each vertex
-        min_face_offsets = np.full(m.vertices.shape[0], true_offsets.max() + 1)
-        np.minimum.at(min_face_offsets, m.faces[:,0], true_offsets[:,0])
-        np.minimum.at(min_face_offsets, m.faces[:,1], true_offsets[:,1])
-        np.minimum.at(min_face_offsets, m.faces[:,2], true_offsets[:,2])
+        min_face_offsets = scatter_min(m.faces, true_offsets,
+                                       m.vertices.shape[0],
+                                       true_offsets.max() + 1)
         min_face_offsets = min_face_offsets.reshape(-1,1)
         s = d / min_face_offsets
         v_disp = vn * s
     else:
         raise RuntimeError("Wrong mesh offset method: " + method)
 
-    om = Mesh(m.vertices + v_disp, m.faces)
+    om = Mesh(m.vertices + v_disp, m.faces, face_attrs=m.face_attrs,
+              dtype=m.vertices.dtype)
     if return_true_offsets:
         true_offsets = check_offset(m, v_disp)
         return om, true_offsets
@@ -5,7 +5,7 @@ import numpy as np
 import mapbox_earcut
 
 from .mesh import Mesh
-from .topo import unused_vertices
+from .topo import unused_vertices, edge_loops
 from .geom import normals_cross
 
 def slice_horiz_0(m, keep="both", fill=None):
@@ -105,11 +105,14 @@ def slice_horiz_0(m, keep="both", fill=None):
             mask = (s[opposite_idx.ravel()] <= 0)
         new_faces_1 = new_faces_1[mask]
         new_normals_1 = new_normals[mask]
+        new_src_1 = cut_face_idx[mask]
         new_faces_2 = new_faces_2[~mask]
         new_normals_2 = new_normals[~mask]
+        new_src_2 = cut_face_idx[~mask]
         new_faces_3 = new_faces_3[~mask]
     else:
         new_normals_1 = new_normals_2 = new_normals
+        new_src_1 = new_src_2 = cut_face_idx
     m_sliced.faces = np.vstack([m_sliced.faces,
                                 new_faces_1,
                                 new_faces_2,
@@ -119,31 +122,20 @@ def slice_horiz_0(m, keep="both", fill=None):
                                   new_normals_2,
                                   new_normals_2, # same as normals_2
                                   ])
+    if m.face_attrs is not None:
+        # new faces inherit attributes of faces they were cut from
+        m_sliced.face_attrs = m.face_attrs[np.concatenate([
+                                  np.flatnonzero(keep_faces),
+                                  new_src_1,
+                                  new_src_2,
+                                  new_src_2,
+                                  ])]
 
     # fill the hole
     if fill:
         # find new edges
         new_edges = np.vstack([new_faces_1[:,[2,1]], new_faces_2[:,[2,1]]])
-        new_edge_order = np.argsort(new_edges[:,0])
-        new_edges = new_edges[new_edge_order]
-        print(new_edges)
-        
-        edge_dict = {int(i):int(j) for i, j in new_edges}
-        assert len(new_edges) == len(edge_dict)
-
-        # find cycles of vertices
-        remaining = set(range(two_on_side.shape[0]))
-        cycles = []
-        while len(edge_dict) > 0:
-            cur_cycle = []
-            cur_idx = next(iter(edge_dict.keys()))
-            while cur_idx in edge_dict:
-                cur_cycle.append(cur_idx)
-                prev_idx = cur_idx
-                cur_idx = edge_dict[cur_idx]
-                del edge_dict[prev_idx]
-            print(cur_cycle)
-            cycles.append(np.array(cur_cycle))
+        cycles = edge_loops(new_edges)
 
         # prepare data for mapbox_earcut
         # TODO: holes are treated as separate vertices!  fix this!
@@ -151,7 +143,6 @@ def slice_horiz_0(m, keep="both", fill=None):
         # TODO: triangulation may have problems with collinear points
         nrm = np.array([0.0,0,1 if keep=="negative" else -1])
         for cycle in cycles:
-            print(cycle)
             cycle_verts = m_sliced.vertices[cycle][:,:2]
             cycle_faces = mapbox_earcut.triangulate_float64(cycle_verts,
                                                             [len(cycle)])
@@ -163,12 +154,14 @@ def slice_horiz_0(m, keep="both", fill=None):
             m_sliced.faces = np.vstack([m_sliced.faces, cycle_faces])
             m_sliced.normals = np.vstack([m_sliced.normals,
                                           np.tile(nrm, (cycle_faces.shape[0], 1))])
+            if m_sliced.face_attrs is not None:
+                m_sliced.face_attrs = np.concatenate([m_sliced.face_attrs,
+                    np.zeros(cycle_faces.shape[0], dtype=np.uint16)])
 
     # remove unused vertices
     m_sliced.delete_vertices(unused_vertices(m_sliced))
 
-    from py3do.topo import EdgeToFaceMap
-    efm = EdgeToFaceMap(m_sliced)
+    efm = m_sliced.edge_to_face_map
     print(f"Model edges are {'' if efm.oriented else 'NOT '}correctly oriented")
     print(f"Model is {'' if efm.manifold else 'NOT '}manifold")
     print(f"Model is {'' if efm.watertight else 'NOT '}watertight")
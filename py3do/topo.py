@@ -1,8 +1,10 @@
 """Topological properties."""
 
 import numpy as np
+from scipy.sparse import coo_array
+from scipy.sparse.csgraph import connected_components as graph_components
 
-from .utils import UnionFind, arg_split
+from .utils import arg_split, pairs_to_csr, renumber_by_first
 
 def repeated_face_vertices(m):
     """Check if any triangle has repeated vertices."""
@@ -36,7 +38,13 @@ def sorted_edges(m, return_order=False, unique=True):
         return edges, orientations
     if unique:
         assert not return_order
-        edges = np.unique(edges, axis=0)
+        # sort integer keys, much faster than np.unique(axis=0)
+        n = int(edges.max()) + 1 if edges.shape[0] > 0 else 0
+        keys = np.sort(edges[:,0].astype(np.int64) * n + edges[:,1])
+        first = np.ones(keys.shape[0], dtype=bool)
+        first[1:] = (keys[1:] != keys[:-1])
+        keys = keys[first]
+        edges = np.column_stack([keys // n, keys % n]).astype(edges.dtype)
     return edges
 
 class EdgeToFaceMap:
@@ -51,20 +59,49 @@ class EdgeToFaceMap:
         edges = np.column_stack([edges,
                         np.tile(np.arange(m.faces.shape[0],
                                               dtype=edges.dtype), 3)])
-        rec_dtype = edges.dtype
-        self.view_dt = np.dtype([("i", rec_dtype), ("j", rec_dtype),
-                                     ("face", rec_dtype)])
-        self.query_dt = np.dtype([("i", rec_dtype), ("j", rec_dtype)])
         # create a view to emulate lexicographic searchsorted
         assert edges.flags.c_contiguous
         n = edges.shape[0]
-        edges_rec = edges.view(dtype=self.view_dt).reshape((n,))
-        idx = edges_rec.argsort()
-        self.edges_rec = edges_rec[idx]
-        self.orientations = orientations[idx] * 1
-        self.unique_edges, self.unique_edges_ptr, self.face_counts = \
-                        np.unique(self.edges_rec[["i", "j"]],
-                        return_index=True, return_counts=True)
+        edges_rec = edges.view(dtype=self._record_dtypes(edges.dtype)[0])
+        edges_rec = edges_rec.reshape((n,))
+        # same order as edges_rec.argsort(), lexsort is much faster
+        idx = np.lexsort((edges[:,2], edges[:,1], edges[:,0]))
+        self._init_sorted(edges_rec[idx], orientations[idx] * 1)
+    @staticmethod
+    def _record_dtypes(rec_dtype):
+        view_dt = np.dtype([("i", rec_dtype), ("j", rec_dtype),
+                            ("face", rec_dtype)])
+        query_dt = np.dtype([("i", rec_dtype), ("j", rec_dtype)])
+        return view_dt, query_dt
+    @classmethod
+    def from_sorted_records(cls, edges, orientations):
+        """Recreate the map from stored sorted edge records.
+
+        edges is an n x 3 array of (i, j, face) rows and orientations
+        the matching array of orientations, as in the edges_rec and
+        orientations attributes of an existing map.
+
+        """
+        edges = np.ascontiguousarray(edges)
+        efm = cls.__new__(cls)
+        edges_rec = edges.view(dtype=cls._record_dtypes(edges.dtype)[0])
+        efm._init_sorted(edges_rec.reshape((edges.shape[0],)),
+                         np.asarray(orientations))
+        return efm
+    def _init_sorted(self, edges_rec, orientations):
+        """Compute edge statistics from sorted edge records."""
+        self.view_dt, self.query_dt = \
+                        self._record_dtypes(edges_rec.dtype["i"])
+        self.edges_rec = edges_rec
+        self.orientations = orientations
+        # edges_rec is sorted, so unique edges start where i or j change
+        n = edges_rec.shape[0]
+        new_edge = np.ones(n, dtype=bool)
+        new_edge[1:] = (edges_rec["i"][1:] != edges_rec["i"][:-1]) |\
+                       (edges_rec["j"][1:] != edges_rec["j"][:-1])
+        self.unique_edges_ptr = np.flatnonzero(new_edge)
+        self.unique_edges = self.edges_rec[["i", "j"]][self.unique_edges_ptr]
+        self.face_counts = np.diff(self.unique_edges_ptr, append=n)
         self.manifold = np.all(self.face_counts <= 2)
         self.watertight = np.all(self.face_counts == 2)
         # check edge orientation
@@ -83,44 +120,358 @@ class EdgeToFaceMap:
     def get_misoriented_edges(self):
         return self.unique_edges[~self.oriented_edge]
     def find_faces(self, i, j=None, return_type="dict"):
-        """Find faces adjacent to given edges."""
-        dt = self.query_dt
-        if np.isscalar(i):
-            if not np.isscalar(j):
+        """Find faces adjacent to given edges.
+
+        Edges are given as two arrays (or scalars) i and j of end
+        vertices, or as a single n x 2 array i.  Order of end vertices
+        does not matter.
+
+        return_type "dict" returns a dict mapping sorted edges to lists
+        of faces.  "array" returns a pair (counts, faces) of arrays
+        where faces of all queried edges are concatenated, "csr" a pair
+        (indptr, faces) where faces of edge k are
+        faces[indptr[k]:indptr[k+1]].  Edges not present in the mesh
+        have no faces: count 0 or an empty list.
+
+        """
+        if j is not None:
+            if np.isscalar(i) != np.isscalar(j) or np.shape(i) != np.shape(j):
                 raise RuntimeError("Edge indices must have matching shapes")
-            ij = np.array([(i, j)], dtype=dt)
-        elif j is not None:
-            ij = np.squeeze(np.atleast_2d(np.column_stack([i, j])).view(dt))
+            i = np.atleast_1d(i)
+            j = np.atleast_1d(j)
         else:
             ij = np.atleast_2d(i)
-            ij = np.atleast_2d(i).view(dt).reshape((len(ij),))
-        indices = np.searchsorted(self.unique_edges, ij)
-        assert return_type == "dict"
+            if ij.ndim != 2 or ij.shape[1] != 2:
+                raise RuntimeError("Edges must be given as an n x 2 array")
+            i, j = ij[:,0], ij[:,1]
+        q = np.empty(i.shape[0], dtype=self.query_dt)
+        q["i"] = np.minimum(i, j)
+        q["j"] = np.maximum(i, j)
+        n_u = self.unique_edges.shape[0]
+        k = np.minimum(np.searchsorted(self.unique_edges, q), max(n_u - 1, 0))
+        if n_u > 0:
+            found = (self.unique_edges[k] == q)
+        else:
+            found = np.zeros(q.shape[0], dtype=bool)
+        counts = np.zeros(q.shape[0], dtype=np.intp)
+        counts[found] = self.face_counts[k[found]]
+        indptr = np.zeros(q.shape[0] + 1, dtype=np.intp)
+        np.cumsum(counts, out=indptr[1:])
+        starts = self.unique_edges_ptr[k] if n_u > 0 else counts
+        pos = np.repeat(starts - indptr[:-1], counts) + np.arange(indptr[-1])
+        faces = self.edges_rec["face"][pos]
+        if return_type == "array":
+            return counts, faces
+        if return_type == "csr":
+            return indptr, faces
+        if return_type != "dict":
+            raise RuntimeError("Unknown return_type: " + str(return_type))
+        faces = faces.tolist()
         ret = dict()
-        for k in indices:
-            e = tuple(self.unique_edges[k])
-            nf = self.face_counts[k]
-            idx = self.unique_edges_ptr[k]
-            ret[e] = list(self.edges_rec[idx:idx+nf]["face"])
+        for e, a, b in zip(zip(q["i"].tolist(), q["j"].tolist()),
+                           indptr[:-1].tolist(), indptr[1:].tolist()):
+            ret[e] = faces[a:b]
         return ret
 
+class HalfEdgeMesh:
+    """Array based half-edge representation of a mesh.
+
+    Half-edge h goes from vertex[h] to vertex[next[h]] and belongs to
+    face[h], twin[h] is the opposite half-edge or -1 on boundaries and
+    non-manifold edges.  Initially half-edges of face f are 3*f, 3*f+1
+    and 3*f+2.  vertex_halfedge gives an outgoing half-edge of each
+    vertex (-1 for unused vertices), a boundary one if there is any,
+    face_halfedge a half-edge of each face.
+
+    All arrays are built in vectorized form, traversal helpers take
+    O(1) time per step.
+
+    """
+    def __init__(self, m):
+        self.vertices = m.vertices
+        self.face_attrs = m.face_attrs
+        n = m.vertices.shape[0]
+        n_f = m.faces.shape[0]
+        h = np.arange(3 * n_f)
+        k = h % 3
+        self.vertex = m.faces.ravel().astype(np.intp)
+        self.face = h // 3
+        self.next = h - k + (k + 1) % 3
+        self.prev = h - k + (k + 2) % 3
+        self.face_halfedge = 3 * np.arange(n_f)
+        # twins: match keys of reversed half-edges, only if the edge
+        # has exactly one half-edge in each direction
+        dest = self.vertex[self.next]
+        keys = self.vertex * n + dest
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        rev_keys = dest * n + self.vertex
+        rev_lo = np.searchsorted(sorted_keys, rev_keys, "left")
+        rev_hi = np.searchsorted(sorted_keys, rev_keys, "right")
+        same_count = np.searchsorted(sorted_keys, keys, "right") -\
+                     np.searchsorted(sorted_keys, keys, "left")
+        has_twin = (rev_hi - rev_lo == 1) & (same_count == 1)
+        self.twin = np.full(3 * n_f, -1)
+        self.twin[has_twin] = order[rev_lo[has_twin]]
+        self.vertex_halfedge = np.full(n, -1)
+        self.vertex_halfedge[self.vertex] = h
+        bnd = np.flatnonzero(self.twin < 0)
+        self.vertex_halfedge[self.vertex[bnd]] = bnd
+    def dest(self, h):
+        """Vertex half-edge(s) h point to."""
+        return self.vertex[self.next[h]]
+    def boundary_halfedges(self):
+        """Half-edges without a twin."""
+        return np.flatnonzero(self.twin < 0)
+    def outgoing(self, v):
+        """Outgoing half-edges of vertex v in order around it.
+
+        Starts at a boundary half-edge if v has one.  Only one fan is
+        visited at non-manifold vertices."""
+        start = self.vertex_halfedge[v]
+        ret = []
+        h = start
+        while h >= 0:
+            ret.append(int(h))
+            h = self.twin[self.prev[h]]
+            if h == start:
+                break
+        return ret
+    def vertex_neighbors(self, v):
+        """Vertices connected to vertex v by an edge, in order around
+        it."""
+        hs = self.outgoing(v)
+        ret = [int(self.dest(h)) for h in hs]
+        if len(hs) > 0 and self.twin[self.prev[hs[-1]]] < 0:
+            # the last edge of an open fan is incoming
+            ret.append(int(self.vertex[self.prev[hs[-1]]]))
+        return ret
+    def vertex_faces(self, v):
+        """Faces around vertex v."""
+        return [int(self.face[h]) for h in self.outgoing(v)]
+    def face_halfedges(self, f):
+        """The three half-edges of face f."""
+        h = self.face_halfedge[f]
+        return [int(h), int(self.next[h]), int(self.prev[h])]
+    def face_neighbors(self, f):
+        """Faces sharing an edge with face f."""
+        return [int(self.face[self.twin[h]])
+                for h in self.face_halfedges(f) if self.twin[h] >= 0]
+    def flip_edge(self, h):
+        """Flip the edge of half-edge h in place.
+
+        The edge a-b between triangles a, b, c and b, a, d is replaced
+        by the edge c-d.  Raises RuntimeError for boundary edges."""
+        t = self.twin[h]
+        if t < 0:
+            raise RuntimeError("Cannot flip a boundary edge")
+        hn, hp = self.next[h], self.prev[h]
+        tn, tp = self.next[t], self.prev[t]
+        a, b = self.vertex[h], self.vertex[t]
+        c, d = self.vertex[hp], self.vertex[tp]
+        if c == d:
+            raise RuntimeError("Cannot flip edge, faces share all vertices")
+        f_h, f_t = self.face[h], self.face[t]
+        # new faces: (a, d, c) with tn, h, hp and (b, c, d) with hn, t, tp
+        self.vertex[h] = d
+        self.vertex[t] = c
+        for cycle, f in [((tn, h, hp), f_h), ((hn, t, tp), f_t)]:
+            for i in range(3):
+                self.next[cycle[i]] = cycle[(i + 1) % 3]
+                self.prev[cycle[i]] = cycle[(i + 2) % 3]
+                self.face[cycle[i]] = f
+        self.face_halfedge[f_h] = h
+        self.face_halfedge[f_t] = t
+        if self.vertex_halfedge[a] == h:
+            self.vertex_halfedge[a] = tn
+        if self.vertex_halfedge[b] == t:
+            self.vertex_halfedge[b] = hn
+    def to_mesh(self):
+        """Convert back to a Mesh.  Normals are recomputed."""
+        h0 = self.face_halfedge
+        h1 = self.next[h0]
+        faces = np.column_stack([self.vertex[h0], self.vertex[h1],
+                                 self.vertex[self.next[h1]]])
+        from .mesh import Mesh
+        return Mesh(self.vertices, faces, face_attrs=self.face_attrs,
+                    dtype=self.vertices.dtype)
+
+def vertex_face_adjacency(m):
+    """Faces containing each vertex.
+
+    Returned in compressed sparse row form (indptr, indices), faces of
+    vertex i are indices[indptr[i]:indptr[i+1]] in ascending order.
+    See py3do.utils.csr_select for querying many vertices at once."""
+    n_f = m.faces.shape[0]
+    return pairs_to_csr(m.faces.ravel(), np.repeat(np.arange(n_f), 3),
+                        m.vertices.shape[0])
+
+def vertex_vertex_adjacency(m):
+    """Vertices connected to each vertex by an edge, in compressed
+    sparse row form (see vertex_face_adjacency) sorted ascending."""
+    edges = sorted_edges(m, unique=True)
+    rows = np.concatenate([edges[:,0], edges[:,1]])
+    cols = np.concatenate([edges[:,1], edges[:,0]])
+    order = np.lexsort((cols, rows))
+    return pairs_to_csr(rows[order], cols[order], m.vertices.shape[0])
+
+def face_face_adjacency(m, efm=None):
+    """Faces sharing an edge with each face, in compressed sparse row
+    form (see vertex_face_adjacency) sorted ascending.
+
+    All faces of edges with more than two faces are neighbors.  efm
+    is an optional precomputed EdgeToFaceMap of m."""
+    if efm is None:
+        efm = EdgeToFaceMap(m)
+    n_f = m.faces.shape[0]
+    faces = efm.edges_rec["face"].astype(np.intp)
+    # pair every edge record with all records of its edge
+    group_size = np.repeat(efm.face_counts, efm.face_counts)
+    group_start = np.repeat(efm.unique_edges_ptr, efm.face_counts)
+    rec = np.repeat(np.arange(faces.shape[0]), group_size)
+    rec_start = np.cumsum(group_size) - group_size
+    partner = np.repeat(group_start - rec_start, group_size) +\
+              np.arange(rec.shape[0])
+    mask = (rec != partner)
+    # faces sharing several edges are paired only once
+    pairs = np.sort(faces[rec[mask]] * n_f + faces[partner[mask]])
+    first = np.ones(pairs.shape[0], dtype=bool)
+    first[1:] = (pairs[1:] != pairs[:-1])
+    pairs = pairs[first]
+    return pairs_to_csr(pairs // n_f, pairs % n_f, n_f)
+
+def _successor_loops(succ):
+    """Split elements linked by a successor map into closed loops.
+
+    succ[k] is the element following k or -1.  Returns a list of
+    arrays of elements of each loop in order, starting at its lowest
+    element.  Elements not on closed loops are ignored.  Loops are
+    labeled and ordered by pointer jumping in O(n log n) array
+    operations."""
+    n = succ.shape[0]
+    if n == 0:
+        return []
+    n_steps = int(np.ceil(np.log2(n))) + 1  # 2**n_steps > n
+    # label loops with their lowest element, paths ending in -1 are not
+    # loops
+    label = np.arange(n)
+    jump = succ.copy()
+    for _ in range(n_steps):
+        valid = (jump >= 0)
+        new_label = label.copy()
+        new_label[valid] = np.minimum(label[valid], label[jump[valid]])
+        new_jump = np.full(n, -1)
+        new_jump[valid] = jump[jump[valid]]
+        label, jump = new_label, new_jump
+    on_loop = (jump >= 0)
+    # cut loops before their first element and rank elements by
+    # distance to the end of the loop
+    nxt = np.where(label[np.maximum(succ, 0)] == succ, -1, succ)
+    dist = (nxt >= 0).astype(np.intp)
+    for _ in range(n_steps):
+        valid = (nxt >= 0)
+        new_dist = dist.copy()
+        new_dist[valid] += dist[nxt[valid]]
+        new_nxt = np.full(n, -1)
+        new_nxt[valid] = nxt[nxt[valid]]
+        dist, nxt = new_dist, new_nxt
+    idx = np.flatnonzero(on_loop)
+    idx = idx[np.lexsort((-dist[idx], label[idx]))]
+    return np.split(idx, np.flatnonzero(np.diff(label[idx])) + 1)
+
+def _split_simple(loop):
+    """Split a closed loop of vertices visiting some vertex more than
+    once into simple loops."""
+    ret = []
+    path = []
+    where = {}
+    for v in loop.tolist():
+        if v in where:
+            i = where[v]
+            ret.append(np.array(path[i:]))
+            for u in path[i+1:]:
+                del where[u]
+            del path[i+1:]
+        else:
+            where[v] = len(path)
+            path.append(v)
+    ret.append(np.array(path))
+    return ret
+
+def edge_loops(edges):
+    """Order directed edges into closed loops.
+
+    edges is an n x 2 array of directed edges (u, v).  Returns a list
+    of arrays of vertices of each loop in edge direction.  Loops
+    touching at a vertex are split into simple loops.  Edges not lying
+    on closed loops are ignored.
+
+    Edges are linked into a successor map by sorting, loops are then
+    found by pointer jumping.  Only loops visiting a vertex twice are
+    processed in Python.
+
+    """
+    edges = np.asarray(edges).reshape(-1, 2)
+    n = edges.shape[0]
+    # pair k-th edge into vertex v with k-th edge out of v
+    out_order = np.argsort(edges[:,0], kind="stable")
+    out_v = edges[out_order,0]
+    in_order = np.argsort(edges[:,1], kind="stable")
+    in_v = edges[in_order,1]
+    in_start = np.searchsorted(in_v, in_v, "left")
+    out_start = np.searchsorted(out_v, in_v, "left")
+    out_end = np.searchsorted(out_v, in_v, "right")
+    pos = out_start + np.arange(n) - in_start
+    linked = (pos < out_end)
+    succ = np.full(n, -1)
+    succ[in_order[linked]] = out_order[pos[linked]]
+    loops = []
+    for idx in _successor_loops(succ):
+        loop = edges[idx,0]
+        if np.unique(loop).shape[0] < loop.shape[0]:
+            loops.extend(_split_simple(loop))
+        else:
+            loops.append(loop)
+    return loops
+
+def boundary_loops(m, efm=None):
+    """Boundary loops of mesh m.
+
+    Returns a list of simple loops (see edge_loops) of edges with a
+    single face, as arrays of vertices in the direction of the edges
+    in their faces.  efm is an optional precomputed EdgeToFaceMap of
+    m."""
+    if efm is None:
+        efm = EdgeToFaceMap(m)
+    ptr = efm.unique_edges_ptr[efm.face_counts == 1]
+    rec = efm.edges_rec[ptr]
+    flip = (efm.orientations[ptr] != 0)
+    edges = np.column_stack([np.where(flip, rec["j"], rec["i"]),
+                             np.where(flip, rec["i"], rec["j"])])
+    return edge_loops(edges)
+
 def connected_components(m):
     """Detect connected components.  Only face information is used,
     overlapping is not taken into account.
 
     returns the number of connected components and two lists of
     integer arrays of respectively vertex and face indices of each
-    component.
+    component.  Components are numbered in order of their lowest
+    vertex (including isolated vertices, which form their own
+    components).
+
+    Components are labeled by scipy.sparse.csgraph on a sparse vertex
+    graph with edges from the first vertex of each face to the other
+    two, then renumbered by their lowest vertex.
 
     """
     n = m.vertices.shape[0]
-    uf = UnionFind(n)
-    for (x,y,z) in m.faces:
-        uf.union(x, y)
-        uf.union(x, z)
-        if uf.n == 1:
-            break
-    nc = uf.n
-    vert_components = uf.sets()
+    rows = np.concatenate([m.faces[:,0], m.faces[:,0]])
+    cols = np.concatenate([m.faces[:,1], m.faces[:,2]])
+    g = coo_array((np.ones(rows.shape[0], dtype=bool), (rows, cols)),
+                  shape=(n, n))
+    nc, labels = graph_components(g, directed=False)
+    # renumber by lowest vertex, independently of the csgraph labeling
+    vert_components = renumber_by_first(labels, nc)[0]
     face_components = vert_components[m.faces[:,0]]
     return nc, arg_split(vert_components, nc), arg_split(face_components, nc)
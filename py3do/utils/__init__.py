@@ -1,2 +1,8 @@
 from .union_find import UnionFind
 from .array_utils import arg_split
+from .array_utils import unique_points
+from .array_utils import pairs_to_csr
+from .array_utils import csr_select
+from .array_utils import scatter_add
+from .array_utils import scatter_min
+from .array_utils import renumber_by_first
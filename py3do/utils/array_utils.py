@@ -8,3 +8,120 @@ def arg_split(set_ids, n):
     for i in range(n):
         set_elems.append(elem_idx[set_idx[i]:set_idx[i+1]])
     return set_elems
+
+def unique_points(points):
+    """Unique rows of an n x 3 float array of points.
+
+    Returns unique points in order of first occurrence and an index
+    array mapping each point to its unique row.  Coordinates are
+    compared bitwise after mapping -0.0 to 0.0, so each point is keyed
+    on its three integer bit patterns and lexsorted once instead of
+    hashing Python tuples.
+
+    """
+    n = points.shape[0]
+    if n == 0:
+        return np.empty((0,3), dtype=points.dtype), np.empty(0, dtype=np.intp)
+    keys = points + points.dtype.type(0)  # -0.0 + 0.0 == 0.0
+    u = keys.view("u" + str(keys.dtype.itemsize))
+    if keys.dtype.itemsize == 4:
+        # pack x and y into a single key
+        sort_keys = [u[:,2], (u[:,0].astype(np.uint64) << np.uint64(32)) | u[:,1]]
+    else:
+        sort_keys = [u[:,2], u[:,1], u[:,0]]
+    # lexsort is stable: first element of each group is its first occurrence
+    idx = np.lexsort(sort_keys)
+    new_group = np.empty(n, dtype=bool)
+    new_group[0] = True
+    new_group[1:] = False
+    for k in sort_keys:
+        k = k[idx]
+        new_group[1:] |= (k[1:] != k[:-1])
+    group = np.cumsum(new_group) - 1
+    first = idx[new_group]
+    # renumber groups in order of first occurrence
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(order.shape[0])
+    point_idx = np.empty(n, dtype=np.intp)
+    point_idx[idx] = rank[group]
+    return points[first[order]], point_idx
+
+def pairs_to_csr(rows, cols, n):
+    """Compressed sparse row form of pairs (rows[k], cols[k]).
+
+    Returns (indptr, indices): the columns of row i are
+    indices[indptr[i]:indptr[i+1]], in order of appearance.  n is the
+    number of rows."""
+    rows = np.asarray(rows)
+    order = np.argsort(rows, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.intp)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+    return indptr, np.asarray(cols)[order]
+
+def csr_select(indptr, indices, rows):
+    """Select rows of a compressed sparse row structure.
+
+    Returns (indptr, indices) of the selected rows in the given
+    order."""
+    rows = np.asarray(rows)
+    starts = indptr[rows]
+    counts = indptr[rows + 1] - starts
+    sub_indptr = np.zeros(rows.shape[0] + 1, dtype=np.intp)
+    np.cumsum(counts, out=sub_indptr[1:])
+    pos = np.repeat(starts - sub_indptr[:-1], counts) +\
+          np.arange(sub_indptr[-1])
+    return sub_indptr, indices[pos]
+
+def scatter_add(idx, values, n):
+    """Sums of values grouped by idx.
+
+    Returns an array of length n (or n x k for an n x k values array)
+    whose i-th row is the sum of rows of values with idx equal to i.
+    Same as np.add.at on a zero array, but uses np.bincount for each
+    column which is much faster.  The result has the dtype of values.
+
+    """
+    idx = np.asarray(idx).ravel()
+    values = np.asarray(values)
+    if values.ndim == 1:
+        return np.bincount(idx, weights=values,
+                           minlength=n).astype(values.dtype, copy=False)
+    ret = np.empty((n, values.shape[1]), dtype=values.dtype)
+    for k in range(values.shape[1]):
+        ret[:,k] = np.bincount(idx, weights=values[:,k], minlength=n)
+    return ret
+
+def scatter_min(idx, values, n, fill):
+    """Minima of values grouped by idx.
+
+    Returns an array of length n whose i-th element is the minimum of
+    values with idx equal to i, or fill if there are none.  Same as
+    np.minimum.at on an array filled with fill (if fill is not
+    smaller than the values), but computed with np.minimum.reduceat
+    on values sorted by idx.
+
+    """
+    idx = np.asarray(idx).ravel()
+    values = np.asarray(values).ravel()
+    ret = np.full(n, fill, dtype=values.dtype)
+    if idx.shape[0] == 0:
+        return ret
+    order = np.argsort(idx, kind="stable")
+    sorted_idx = idx[order]
+    starts = np.flatnonzero(np.diff(sorted_idx, prepend=-1))
+    ret[sorted_idx[starts]] = np.minimum.reduceat(values[order], starts)
+    return ret
+
+def renumber_by_first(labels, n):
+    """Renumber labels 0 <= labels < n in order of first occurrence.
+
+    Returns the new labels and the index of the first element with
+    each new label.  Labels which do not occur are numbered last."""
+    labels = np.asarray(labels)
+    m = labels.shape[0]
+    first = scatter_min(labels, np.arange(m), n, m)
+    order = np.argsort(first, kind="stable")
+    rank = np.empty(n, dtype=np.intp)
+    rank[order] = np.arange(n)
+    return rank[labels], first[order]
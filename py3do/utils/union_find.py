@@ -2,7 +2,7 @@
 
 import numpy as np
 
-from .array_utils import arg_split
+from .array_utils import arg_split, renumber_by_first
 
 class UnionFind:
     def __init__(self, n):
@@ -10,34 +10,100 @@ class UnionFind:
         self.n_elem = n
         self.n = n
         self.parents = np.arange(n)
+        self.sizes = np.ones(n, dtype=np.intp)
     def find(self, i):
+        """Root of element(s) i.
+
+        Scalars use _find_scalar.  For arrays parents of the queried
+        elements only are followed with array operations until all
+        roots are reached, i are then attached directly to their
+        roots.  Work is proportional to the size of i times tree
+        depth, the rest of the structure is not touched."""
+        if np.ndim(i) == 0:
+            return self._find_scalar(i)
         # skip bound checking for speed
-        ip = self.parents[i]
-        if (i != ip).any():
-            ip = self.find(ip)
-            self.parents[i] = ip
-        return ip
+        p = self.parents
+        r = p[i]
+        while True:
+            rr = p[r]
+            if np.array_equal(rr, r):
+                break
+            r = rr
+        p[i] = r
+        return r
+    def _compress(self):
+        """Attach all elements directly to their roots by pointer
+        jumping, each pass halves the depth of all trees.  Used by
+        union_many, whose hooking may create long chains of roots."""
+        p = self.parents
+        while True:
+            pp = p[p]
+            if np.array_equal(pp, p):
+                break
+            p[:] = pp
     def _find_scalar(self, i):
-        """Fast version for scalars, avoids call to .any()"""
+        """Fast version for scalars, avoids array operations"""
         # skip bound checking for speed
-        ip = self.parents[i]
-        if i != ip:
-            ip = self._find_scalar(ip)
-            self.parents[i] = ip
-        return ip
+        p = self.parents
+        root = i
+        while p[root] != root:
+            root = p[root]
+        # path compression
+        while p[i] != root:
+            p[i], i = root, p[i]
+        return root
     def union(self, i, j):
+        """Merge sets of i and j, the smaller set is attached to the
+        larger one.  Returns the root of the merged set."""
         # skip bound checking for speed
         i = self._find_scalar(i)
         j = self._find_scalar(j)
         if i != j:
+            if self.sizes[i] < self.sizes[j]:
+                i, j = j, i
             self.n = self.n-1
             self.parents[j] = i
+            self.sizes[i] += self.sizes[j]
         return i
+    def union_many(self, i, j):
+        """Merge sets of i[k] and j[k] for all k.
+
+        Works in vectorized passes.  In each pass roots of all
+        remaining pairs are found and the smaller root of each pair,
+        ordered by set size and then by number, is attached to the
+        other one.  Roots are ordered the same way within a pass, so no
+        cycles are created, chains of hooked roots are then flattened by
+        pointer jumping.  Pairs already in the same set are dropped.
+
+        """
+        i = np.asarray(i).ravel()
+        j = np.asarray(j).ravel()
+        if i.shape != j.shape:
+            raise RuntimeError("union_many: i and j must have the same length")
+        while i.shape[0] > 0:
+            ri = self.find(i)
+            rj = self.find(j)
+            mask = (ri != rj)
+            i, j, ri, rj = i[mask], j[mask], ri[mask], rj[mask]
+            if i.shape[0] == 0:
+                break
+            si = self.sizes[ri]
+            sj = self.sizes[rj]
+            swap = (si > sj) | ((si == sj) & (ri > rj))
+            lo = np.where(swap, rj, ri)
+            hi = np.where(swap, ri, rj)
+            self.parents[lo] = hi
+            self._compress()
+            hooked = np.zeros(self.n_elem, dtype=bool)
+            hooked[lo] = True
+            hooked = np.flatnonzero(hooked)
+            self.n -= hooked.shape[0]
+            np.add.at(self.sizes, self.find(hooked), self.sizes[hooked])
     def sets(self):
         """Return the set each element belongs numbered consecutively
-        from 0."""
-        _ = self.find(np.arange(self.n_elem))
-        return np.unique(self.parents, return_inverse=True)[1]
+        from 0 in order of their lowest elements."""
+        roots = self.find(np.arange(self.n_elem))
+        return renumber_by_first(roots, self.n_elem)[0]
     def set_elements(self):
         """Return a list of arrays of elements of each set."""
         sets = self.sets()
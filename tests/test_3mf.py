@@ -0,0 +1,106 @@
+import io
+import zipfile
+
+import numpy as np
+import pytest
+
+from py3do import cube, uv_sphere, volume
+from py3do.io import read_3mf, write_3mf, read_mesh
+
+
+def test_roundtrip():
+    c = cube()
+    s = uv_sphere(8)
+    f = io.BytesIO()
+    write_3mf([c, s], f)
+    f.seek(0)
+    ms = read_3mf(f)
+    assert len(ms) == 2
+    for m, m2 in zip([c, s], ms):
+        assert np.array_equal(m.vertices, m2.vertices)
+        assert np.array_equal(m.faces, m2.faces)
+
+
+def test_transforms(tmp_path):
+    c = cube()
+    T = np.eye(4)
+    T[:3,3] = [10, 0, 0]
+    M = np.diag([-1.0, 2.0, 1.0, 1.0])  # mirror and scale
+    fname = tmp_path / "plate.3mf"
+    write_3mf([c, c], fname, transforms=[T, M])
+    c1, c2 = read_3mf(fname)
+    assert np.array_equal(c1.vertices, c.vertices + [10, 0, 0])
+    assert np.array_equal(c2.vertices, c.vertices * [-1, 2, 1])
+    # mirrored faces are reoriented
+    assert volume(c2) == pytest.approx(2)
+    merged = read_mesh(str(fname))
+    assert merged.vertices.shape == (16, 3)
+    assert merged.faces.shape == (24, 3)
+    assert volume(merged) == pytest.approx(3)
+
+
+def test_components():
+    model = """<?xml version="1.0" encoding="UTF-8"?>
+<model unit="millimeter" xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02">
+<resources>
+<object id="1" type="model"><mesh>
+<vertices>
+<vertex x="0" y="0" z="0"/><vertex x="1" y="0" z="0"/>
+<vertex x="0" y="1" z="0"/><vertex x="0" y="0" z="1"/>
+</vertices>
+<triangles>
+<triangle v1="0" v2="2" v3="1"/><triangle v1="0" v2="1" v3="3"/>
+<triangle v1="0" v2="3" v3="2"/><triangle v1="1" v2="2" v3="3"/>
+</triangles>
+</mesh></object>
+<object id="2" type="model"><components>
+<component objectid="1"/>
+<component objectid="1" transform="1 0 0 0 1 0 0 0 1 5 0 0"/>
+</components></object>
+</resources>
+<build><item objectid="2" transform="1 0 0 0 1 0 0 0 1 0 0 7"/></build>
+</model>
+"""
+    f = io.BytesIO()
+    with zipfile.ZipFile(f, "w") as zf:
+        zf.writestr("3D/3dmodel.model", model)
+    f.seek(0)
+    ms = read_3mf(f)
+    assert len(ms) == 1
+    m = ms[0]
+    assert m.vertices.shape == (8, 3)
+    assert m.faces.shape == (8, 3)
+    assert m.vertices[:,2].min() == 7
+    assert m.vertices[:,0].max() == 6
+    assert volume(m) == pytest.approx(2 / 6)
+
+
+@pytest.mark.parametrize("unit, scale", [("millimeter", 1), ("inch", 25.4),
+                                         ("micron", 1e-3), (None, 1)])
+def test_units(unit, scale):
+    m = cube()
+    f = io.BytesIO()
+    write_3mf([m], f, transforms=[np.diag([1, 1, 1, 1.0])])
+    with zipfile.ZipFile(f) as zf:
+        model = zf.read("3D/3dmodel.model").decode()
+    if unit is None:
+        model = model.replace(' unit="millimeter"', "")
+    else:
+        model = model.replace('unit="millimeter"', 'unit="%s"' % unit)
+    f = io.BytesIO()
+    with zipfile.ZipFile(f, "w") as zf:
+        zf.writestr("3D/3dmodel.model", model)
+    f.seek(0)
+    m2 = read_3mf(f)[0]
+    assert np.allclose(m2.vertices, m.vertices * scale)
+
+
+def test_unknown_unit():
+    f = io.BytesIO()
+    with zipfile.ZipFile(f, "w") as zf:
+        zf.writestr("3D/3dmodel.model",
+                    '<model unit="parsec" xmlns="http://schemas.microsoft.'
+                    'com/3dmanufacturing/core/2015/02"/>')
+    f.seek(0)
+    with pytest.raises(RuntimeError, match="Unknown 3MF unit"):
+        read_3mf(f)
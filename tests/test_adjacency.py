@@ -0,0 +1,40 @@
+import numpy as np
+
+from py3do import Mesh, cube, uv_sphere
+from py3do import vertex_face_adjacency, face_face_adjacency
+from py3do.utils import csr_select, pairs_to_csr
+
+def _rows(csr):
+    indptr, indices = csr
+    return [list(indices[indptr[i]:indptr[i+1]])
+            for i in range(indptr.shape[0] - 1)]
+
+def test_pairs_to_csr():
+    indptr, indices = pairs_to_csr([2, 0, 2, 0], [5, 6, 7, 8], 4)
+    assert _rows((indptr, indices)) == [[6, 8], [], [5, 7], []]
+    sub = csr_select(indptr, indices, [2, 1, 0, 2])
+    assert _rows(sub) == [[5, 7], [], [6, 8], [5, 7]]
+
+def test_vertex_adjacency():
+    m = uv_sphere(8)
+    vf = _rows(m.vertex_faces)
+    for i in range(m.vertices.shape[0]):
+        assert vf[i] == list(np.flatnonzero((m.faces == i).any(axis=1)))
+    vv = _rows(m.vertex_vertices)
+    for i in range(m.vertices.shape[0]):
+        nb = set(m.faces[vf[i]].ravel()) - {i}
+        assert vv[i] == sorted(nb)
+    assert m.vertex_faces is m.vertex_faces
+    assert np.array_equal(vertex_face_adjacency(m)[1], m.vertex_faces[1])
+
+def test_face_adjacency():
+    m = cube()
+    ff = _rows(m.face_faces)
+    assert all(len(f) == 3 for f in ff)
+    for i, f in enumerate(ff):
+        for j in f:
+            assert len(set(m.faces[i]) & set(m.faces[j])) == 2
+    # three faces on one edge
+    m = Mesh([[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, -1, 0], [0, 0, 1]],
+             [[0, 1, 2], [1, 0, 3], [0, 1, 4]])
+    assert _rows(face_face_adjacency(m)) == [[1, 2], [0, 2], [0, 1]]
@@ -0,0 +1,89 @@
+import asyncio
+import io
+
+import numpy as np
+import pytest
+
+from py3do import uv_sphere
+from py3do.io import read_stl_async, write_binary_stl_async, read_mesh_async
+from py3do.io import read_stl_stream, write_binary_stl, write_ascii_stl
+from py3do.io import read_binary_stl, read_ascii_stl
+
+
+class _Stream:
+    """Minimal async stream returning data in small chunks."""
+    def __init__(self, data, max_chunk):
+        self.f = io.BytesIO(data)
+        self.max_chunk = max_chunk
+    async def read(self, n):
+        await asyncio.sleep(0)
+        return self.f.read(min(n, self.max_chunk))
+
+async def _aiter(data, chunk):
+    for i in range(0, len(data), chunk):
+        yield data[i:i+chunk]
+
+
+def test_async_files(tmp_path):
+    m = uv_sphere(16)
+    fname = str(tmp_path / "sphere.stl")
+    async def run():
+        await write_binary_stl_async(m, fname)
+        return await asyncio.gather(read_stl_async(fname),
+                                    read_mesh_async(fname))
+    m1, m2 = asyncio.run(run())
+    assert np.array_equal(m1.faces, m2.faces)
+    assert np.array_equal(m1.vertices, m2.vertices)
+    assert m1.faces.shape == m.faces.shape
+
+
+@pytest.mark.parametrize("max_chunk", [1, 37, 1 << 20])
+def test_stream_binary(max_chunk):
+    m = uv_sphere(16)
+    f = io.BytesIO()
+    write_binary_stl(m, f)
+    data = f.getvalue()
+    m1 = asyncio.run(read_stl_stream(_Stream(data, max_chunk)))
+    m2 = asyncio.run(read_stl_stream(_aiter(data, max_chunk)))
+    m_ref = read_binary_stl(io.BytesIO(data))
+    for m_s in [m1, m2]:
+        assert np.array_equal(m_s.vertices, m_ref.vertices)
+        assert np.array_equal(m_s.faces, m_ref.faces)
+    with pytest.raises(RuntimeError, match="Unexpected end of file"):
+        asyncio.run(read_stl_stream(_aiter(data[:-1], max_chunk)))
+    with pytest.raises(RuntimeError, match="Expected end of file"):
+        asyncio.run(read_stl_stream(_aiter(data + b"x", max_chunk)))
+
+
+@pytest.mark.parametrize("chunk_size", [50, 137, 1000])
+def test_stream_batches(chunk_size):
+    m = uv_sphere(16)
+    m.face_attrs = np.arange(m.faces.shape[0], dtype=np.uint16)
+    f = io.BytesIO()
+    write_binary_stl(m, f)
+    data = f.getvalue()
+    m1 = asyncio.run(read_stl_stream(_aiter(data, 77),
+                                     chunk_size=chunk_size))
+    m_ref = read_binary_stl(io.BytesIO(data))
+    assert np.array_equal(m1.vertices, m_ref.vertices)
+    assert np.array_equal(m1.faces, m_ref.faces)
+    assert np.array_equal(m1.normals, m_ref.normals)
+    assert np.array_equal(m1.face_attrs, m_ref.face_attrs)
+
+
+def test_stream_huge_header():
+    # header declaring 2**32-1 faces followed by a single facet
+    data = b"\0" * 80 + b"\xff\xff\xff\xff" + b"\0" * 50
+    with pytest.raises(RuntimeError, match="Unexpected end of file"):
+        asyncio.run(read_stl_stream(_Stream(data, 37)))
+
+
+def test_stream_ascii():
+    m = uv_sphere(8)
+    f = io.StringIO()
+    write_ascii_stl(m, f)
+    data = f.getvalue().encode()
+    m1 = asyncio.run(read_stl_stream(_Stream(data, 100)))
+    m_ref = read_ascii_stl(io.StringIO(data.decode()))
+    assert np.array_equal(m1.vertices, m_ref.vertices)
+    assert np.array_equal(m1.faces, m_ref.faces)
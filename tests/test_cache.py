@@ -0,0 +1,56 @@
+import os
+
+import numpy as np
+
+from py3do import cube, uv_sphere
+from py3do.io import MeshCache, read_mesh, write_binary_stl
+
+
+def test_cache_hit_and_miss(tmp_path):
+    cache = MeshCache(tmp_path / "cache")
+    fname = str(tmp_path / "sphere.stl")
+    s = uv_sphere(16)
+    write_binary_stl(s, fname)
+    m1 = read_mesh(fname, cache=cache)
+    m2 = read_mesh(fname, cache=cache)
+    assert np.array_equal(m1.vertices, m2.vertices)
+    assert np.array_equal(m1.faces, m2.faces)
+    assert np.array_equal(m1.normals, m2.normals)
+    st = cache.stats()
+    assert st["hits"] == 1
+    assert st["misses"] == 1
+    assert st["entries"] == 1
+    assert st["bytes"] > 0
+    # modified file is read again
+    write_binary_stl(cube(), fname)
+    os.utime(fname, ns=(0, 0))
+    m3 = read_mesh(fname, cache=cache)
+    assert m3.faces.shape == (12, 3)
+    assert cache.stats()["misses"] == 2
+    cache.clear()
+    assert cache.stats()["entries"] == 0
+
+
+def test_cache_eviction(tmp_path):
+    fnames = []
+    for i in range(3):
+        fname = str(tmp_path / ("cube" + str(i) + ".stl"))
+        c = cube()
+        c.vertices += i
+        write_binary_stl(c, fname)
+        fnames.append(fname)
+    cache = MeshCache(tmp_path / "cache")
+    read_mesh(fnames[0], cache=cache)
+    entry_size = cache.stats()["bytes"]
+    cache.max_bytes = 2 * entry_size
+    read_mesh(fnames[1], cache=cache)
+    os.utime(os.path.join(cache.cache_dir,
+                          cache.key(fnames[0], fix_nan_normals=False) + ".p3d"),
+             ns=(1, 1))
+    read_mesh(fnames[2], cache=cache)
+    st = cache.stats()
+    assert st["entries"] == 2
+    assert st["evictions"] == 1
+    # the least recently used entry was removed
+    read_mesh(fnames[0], cache=cache)
+    assert cache.stats()["misses"] == 4
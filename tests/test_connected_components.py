@@ -54,3 +54,10 @@ def test_split_3_cubes():
     _test_split_n_cubes(3)
 def test_split_10_cubes():
     _test_split_n_cubes(10)
+
+def test_component_numbering():
+    # faces of the second cube come first, numbering follows vertices
+    repc = _make_repeated_cube(3)
+    m = Mesh(repc.vertices, repc.faces[::-1])
+    nc, component_vertices, _ = connected_components(m)
+    assert [v.min() for v in component_vertices] == [0, 8, 16]
@@ -0,0 +1,72 @@
+import numpy as np
+from pytest import approx
+
+from py3do import Mesh, cube, uv_sphere
+from py3do import boundary_loops, edge_loops, fill_holes, volume
+from py3do import EdgeToFaceMap
+
+def test_edge_loops():
+    edges = [[5, 6], [1, 2], [6, 5], [2, 3], [3, 1], [7, 8]]
+    loops = edge_loops(edges)
+    assert len(loops) == 2
+    assert list(loops[0]) == [5, 6]
+    assert list(loops[1]) == [1, 2, 3]
+    # two loops touching at vertex 0
+    loops = edge_loops([[0, 1], [1, 2], [2, 0], [0, 3], [3, 4], [4, 0]])
+    assert sorted(sorted(l) for l in loops) == [[0, 1, 2], [0, 3, 4]]
+    assert edge_loops(np.empty((0, 2), dtype=int)) == []
+
+def _open_sphere():
+    m = uv_sphere(16)
+    top = np.flatnonzero(m.vertices[:,2] > 0.95)
+    m.delete_vertices(top)
+    return m
+
+def test_boundary_loops():
+    m = _open_sphere()
+    loops = boundary_loops(m)
+    assert len(loops) == 1
+    loop = loops[0]
+    assert loop.shape[0] == 16
+    efm = EdgeToFaceMap(m)
+    # consecutive loop vertices are boundary edges in face direction
+    for u, v in zip(loop, np.roll(loop, -1)):
+        f = efm.find_faces(u, v)[(min(u, v), max(u, v))]
+        assert len(f) == 1
+        fv = list(m.faces[f[0]])
+        assert fv[(fv.index(u) + 1) % 3] == v
+    assert boundary_loops(cube()) == []
+
+def test_fill_holes():
+    m = _open_sphere()
+    m2 = fill_holes(m)
+    efm = EdgeToFaceMap(m2)
+    assert efm.watertight and efm.oriented
+    assert m2.faces.shape[0] == m.faces.shape[0] + 14
+    assert np.allclose(m2.normals[m.faces.shape[0]:], [0, 0, 1])
+    assert np.array_equal(m2.vertices, m.vertices)
+    # transforming the result leaves the original intact
+    v = m.vertices.copy()
+    m2.transform(np.diag([2, 2, 2, 1]))
+    assert np.array_equal(m.vertices, v)
+    assert fill_holes(m, max_edges=10).faces.shape == m.faces.shape
+    # hole replacing one side of the cube
+    c = cube()
+    c.faces = c.faces[2:]
+    c.face_attrs = np.ones(c.faces.shape[0], dtype=np.uint16)
+    c2 = fill_holes(c)
+    assert volume(c2) == approx(1)
+    assert EdgeToFaceMap(c2).watertight
+    assert np.array_equal(c2.face_attrs[-2:], [0, 0])
+
+def test_fill_many_holes():
+    m = uv_sphere(32)
+    rng = np.random.default_rng(0)
+    keep = np.ones(m.faces.shape[0], dtype=bool)
+    keep[rng.choice(m.faces.shape[0], 100, replace=False)] = False
+    m.faces = m.faces[keep]
+    m.normals = m.normals[keep]
+    m2 = fill_holes(m)
+    efm = EdgeToFaceMap(m2)
+    assert efm.watertight and efm.oriented
+    assert volume(m2) == approx(volume(uv_sphere(32)), rel=1e-3)
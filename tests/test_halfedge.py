@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from pytest import approx
+
+from py3do import Mesh, cube, uv_sphere
+from py3do import HalfEdgeMesh, EdgeToFaceMap
+from py3do import volume
+
+def _canonical(faces):
+    """Faces rotated to start at their lowest vertex."""
+    return np.array([np.roll(f, -np.argmin(f)) for f in faces])
+
+def test_halfedge_closed():
+    m = uv_sphere(8)
+    he = HalfEdgeMesh(m)
+    h = np.arange(he.vertex.shape[0])
+    assert (he.twin >= 0).all()
+    assert np.array_equal(he.twin[he.twin], h)
+    assert np.array_equal(he.vertex[he.twin], he.dest(h))
+    assert np.array_equal(he.next[he.prev], h)
+    assert np.array_equal(he.vertex[he.vertex_halfedge],
+                          np.arange(m.vertices.shape[0]))
+    indptr, indices = m.vertex_vertices
+    for v in range(m.vertices.shape[0]):
+        nb = he.vertex_neighbors(v)
+        assert sorted(nb) == list(indices[indptr[v]:indptr[v+1]])
+        assert sorted(he.vertex_faces(v)) ==\
+            list(np.flatnonzero((m.faces == v).any(axis=1)))
+    assert sorted(he.face_neighbors(0)) == list(m.face_faces[1][:3])
+    assert np.array_equal(he.to_mesh().faces, m.faces)
+    m32 = Mesh(m.vertices, m.faces, dtype=np.float32)
+    assert HalfEdgeMesh(m32).to_mesh().vertices.dtype == np.float32
+
+def test_halfedge_boundary():
+    m = cube()
+    m.delete_vertices([0])
+    he = HalfEdgeMesh(m)
+    bnd = he.boundary_halfedges()
+    assert bnd.shape[0] == EdgeToFaceMap(m).get_boundary_edges().shape[0] > 0
+    for v in he.vertex[bnd]:
+        assert he.twin[he.vertex_halfedge[v]] < 0
+        nb = he.vertex_neighbors(v)
+        assert len(nb) == len(set(nb)) == len(he.vertex_faces(v)) + 1
+
+def test_flip_edge():
+    m = Mesh([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0]],
+             [[0, 1, 2], [0, 2, 3]], face_attrs=[1, 2])
+    he = HalfEdgeMesh(m)
+    h = int(np.flatnonzero(he.twin >= 0)[0])
+    he.flip_edge(h)
+    m2 = he.to_mesh()
+    assert np.array_equal(_canonical(m2.faces), [[1, 2, 3], [0, 1, 3]])
+    assert np.array_equal(m2.face_attrs, [1, 2])
+    assert np.allclose(m2.normals, [[0, 0, 1], [0, 0, 1]])
+    assert sorted(he.vertex_neighbors(0)) == [1, 3]
+    with pytest.raises(RuntimeError):
+        he.flip_edge(int(he.boundary_halfedges()[0]))
+    # flipping twice restores a closed mesh
+    c = cube()
+    he = HalfEdgeMesh(c)
+    he.flip_edge(4)
+    he.flip_edge(4)
+    c2 = he.to_mesh()
+    efm = EdgeToFaceMap(c2)
+    assert efm.watertight and efm.oriented
+    assert volume(c2) == approx(1)
+    assert sorted(map(tuple, _canonical(c2.faces))) ==\
+        sorted(map(tuple, _canonical(c.faces)))
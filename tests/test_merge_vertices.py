@@ -0,0 +1,45 @@
+import numpy as np
+
+from py3do import Mesh, cube, uv_sphere
+from py3do import is_isomorphic, volume
+from py3do import EdgeToFaceMap
+
+def _soup(m):
+    """Unwelded copy of mesh m."""
+    return Mesh(m.vertices[m.faces].reshape(-1, 3),
+                np.arange(3 * m.faces.shape[0]).reshape(-1, 3), m.normals)
+
+def test_merge_exact():
+    m = cube()
+    s = _soup(m)
+    vmap = s.merge_vertices()
+    assert vmap.shape == (3 * m.faces.shape[0],)
+    assert np.array_equal(s.vertices[vmap], m.vertices[m.faces].reshape(-1, 3))
+    assert is_isomorphic(s, m)
+    assert EdgeToFaceMap(s).watertight
+
+def test_merge_tol():
+    m = uv_sphere(16)
+    s = _soup(m)
+    rng = np.random.default_rng(0)
+    s.vertices += rng.uniform(-1e-6, 1e-6, s.vertices.shape)
+    assert not is_isomorphic(s, m)
+    s.merge_vertices(1e-5)
+    assert s.vertices.shape == m.vertices.shape
+    assert is_isomorphic(s, m, tol=1e-5)
+    assert not is_isomorphic(s, m, tol=1e-8)
+
+def test_merge_degenerate():
+    m = Mesh([[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 1e-9, 0], [1, 1, 0]],
+             [[0, 1, 2], [1, 3, 2], [3, 4, 2]], face_attrs=[1, 2, 3])
+    vmap = m.merge_vertices(1e-6)
+    assert np.array_equal(vmap, [0, 1, 2, 1, 3])
+    assert np.array_equal(m.faces, [[0, 1, 2], [1, 3, 2]])
+    assert np.array_equal(m.face_attrs, [1, 3])
+
+def test_round_coords_merge():
+    m = _soup(cube())
+    m.vertices += 1e-9
+    m2 = m.round_coords(6, merge=True)
+    assert m2.vertices.shape == (8, 3)
+    assert volume(m2) == volume(cube())
@@ -0,0 +1,97 @@
+import io
+
+import numpy as np
+import pytest
+
+import py3do.mesh
+
+from py3do import Mesh, cube, uv_sphere
+from py3do import normals_cross, normals_Newell, sorted_edges, vertex_normals
+from py3do import volume
+from py3do import EdgeToFaceMap
+from py3do.io import read_stl, write_binary_stl
+
+def test_cached_properties():
+    m = uv_sphere(16)
+    n, a = normals_cross(m)
+    assert np.allclose(m.face_normals, n)
+    assert np.allclose(m.face_areas, a)
+    assert np.array_equal(m.edges, sorted_edges(m))
+    assert np.allclose(m.vertex_normals, vertex_normals(m))
+    assert np.allclose(m.bounds, [m.vertices.min(axis=0), m.vertices.max(axis=0)])
+    efm = m.edge_to_face_map
+    assert efm is m.edge_to_face_map
+    assert np.array_equal(efm.edges_rec, EdgeToFaceMap(m).edges_rec)
+    with pytest.raises(ValueError):
+        m.face_areas[0] = 0
+
+def test_face_geometry_computed_once(monkeypatch):
+    f = io.BytesIO()
+    write_binary_stl(uv_sphere(8), f)
+    f.seek(0)
+    m = read_stl(f)
+    calls = []
+    def counting_normals_cross(m):
+        calls.append(1)
+        return normals_cross(m)
+    monkeypatch.setattr(py3do.mesh, "normals_cross", counting_normals_cross)
+    m.face_normals
+    m.face_areas
+    volume(m)
+    assert len(calls) == 1
+
+def test_cache_invalidation():
+    m = cube()
+    efm = m.edge_to_face_map
+    version = m.version
+    m.vertices = m.vertices * 2
+    assert m.version > version
+    assert np.allclose(m.extents(), 2)
+    assert volume(m) == pytest.approx(8)
+    m.vertices += 1
+    assert np.allclose(m.bounds, [[1, 1, 1], [3, 3, 3]])
+    m.delete_vertices([0])
+    assert m.edge_to_face_map is not efm
+    assert not m.edge_to_face_map.watertight
+    m = cube()
+    m.rot90("x")
+    assert np.allclose(m.bounds, [[0, 0, -1], [1, 1, 0]])
+    m.vertices[:] = 0
+    m.invalidate()
+    assert np.allclose(m.extents(), 0)
+
+def test_float32_mesh():
+    m = uv_sphere(16)
+    m32 = Mesh(m.vertices, m.faces.astype(np.int64), dtype=np.float32,
+               index_dtype=np.int32)
+    assert m32.vertices.dtype == np.float32
+    assert m32.normals.dtype == np.float32
+    assert m32.faces.dtype == np.int32
+    assert m32.face_areas.dtype == np.float32
+    assert vertex_normals(m32).dtype == np.float32
+    assert normals_Newell(m32)[0].dtype == np.float32
+    assert volume(m32) == pytest.approx(volume(m), rel=1e-5)
+    sub, _ = m32.get_submesh(m32.vertices[:,2] > 0)
+    assert sub.vertices.dtype == np.float32
+    f = io.BytesIO()
+    write_binary_stl(m, f)
+    f.seek(0)
+    m1 = read_stl(f, dtype=np.float32)
+    assert m1.vertices.dtype == np.float32
+
+def test_lazy_normals():
+    m = cube()
+    m1 = Mesh(m.vertices, m.faces, compute_normals="lazy", validate=False)
+    assert np.allclose(m1.normals, m.normals)
+    # normals are computed on first access from current vertices
+    m1 = Mesh(m.vertices, m.faces, compute_normals="lazy", validate=False)
+    m1.vertices = m1.vertices * [1, 1, 2]
+    assert np.allclose(m1.normals, normals_cross(m1)[0])
+    assert np.allclose(m1.normals, m1.face_normals)
+    assert np.allclose(m1.face_areas, normals_cross(m1)[1])
+    m2 = Mesh([[0, 0, 0], [1, 0, 0], [2, 0, 0]], [[0, 1, 2]],
+              compute_normals="lazy")
+    with np.errstate(invalid="ignore"):
+        assert np.isnan(m2.normals).all()
+    with pytest.raises(RuntimeError):
+        m2.check_faces_and_vertices()
@@ -0,0 +1,81 @@
+import io
+
+import numpy as np
+import pytest
+
+from py3do import Mesh, cube, uv_sphere
+from py3do.topo import EdgeToFaceMap
+from py3do.io import read_native, write_native, read_mesh, read_meshes
+
+
+def _check_same(m, m2):
+    assert np.array_equal(m.vertices, m2.vertices)
+    assert np.array_equal(m.faces, m2.faces)
+    assert np.array_equal(m.normals, m2.normals)
+
+
+@pytest.mark.parametrize("compress", [False, True])
+@pytest.mark.parametrize("mmap", [False, True])
+def test_roundtrip(tmp_path, compress, mmap):
+    m = uv_sphere(16)
+    fname = tmp_path / "sphere.p3d"
+    write_native(m, fname, compress=compress)
+    m2 = read_native(fname, mmap=mmap)
+    _check_same(m, m2)
+    # modifications do not change the file
+    m2.vertices += 1
+    m3 = read_mesh(str(fname))
+    _check_same(m, m3)
+
+
+def test_float32(tmp_path):
+    m = uv_sphere(16)
+    m32 = Mesh(m.vertices, m.faces.astype(np.int32), dtype=np.float32)
+    fname = tmp_path / "sphere.p3d"
+    write_native(m32, fname)
+    m2 = read_native(fname)
+    assert m2.vertices.dtype == np.float32
+    assert m2.normals.dtype == np.float32
+    assert m2.faces.dtype == np.int32
+    # memory mapped, not copied
+    assert isinstance(m2.vertices.base, np.memmap)
+    _check_same(m32, m2)
+    m3 = read_meshes([str(fname)], executor="process", workers=1)[0].mesh
+    assert m3.vertices.dtype == np.float32
+    _check_same(m32, m3)
+
+
+def test_file_object():
+    m = cube()
+    m.face_attrs = np.arange(12, dtype=np.uint16)
+    f = io.BytesIO()
+    write_native(m, f)
+    f.seek(0)
+    m2 = read_native(f, mmap=False, trusted=True)
+    _check_same(m, m2)
+    assert np.array_equal(m2.face_attrs, m.face_attrs)
+
+
+def test_topology(tmp_path):
+    m = cube()
+    m.faces = np.vstack([m.faces, [[1, 3, 6]]])
+    m.normals = np.vstack([m.normals, [[1, 0, 0]]])
+    fname = tmp_path / "cube.p3d"
+    write_native(m, fname, topology=True)
+    m2, efm2 = read_native(fname, return_topology=True)
+    efm = EdgeToFaceMap(m)
+    assert np.array_equal(efm2.edges_rec, efm.edges_rec)
+    assert np.array_equal(efm2.unique_edges, efm.unique_edges)
+    assert np.array_equal(efm2.face_counts, efm.face_counts)
+    assert efm2.manifold == efm.manifold
+    assert efm2.oriented == efm.oriented
+    assert efm2.find_faces(0, 3) == efm.find_faces(0, 3)
+    assert m2.edge_to_face_map is efm2
+    write_native(m, fname)
+    m2, efm2 = read_native(fname, return_topology=True)
+    assert efm2 is None
+
+
+def test_wrong_magic():
+    with pytest.raises(RuntimeError, match="Not a py3do mesh file"):
+        read_native(io.BytesIO(b"solid x\nendsolid x\n"), mmap=False)
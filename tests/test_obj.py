@@ -1,9 +1,10 @@
 import io
 
+import numpy as np
 import pytest
 
-from py3do.io import read_obj
-from py3do import is_isomorphic
+from py3do.io import read_obj, write_obj
+from py3do import is_isomorphic, uv_sphere
 
 
 def test_simple_triangle():
@@ -106,4 +107,74 @@ f 1 2 3
 """)
     mesh = read_obj(f)
     expected_vertices = [[-1.0, -2.0, -3.0], [-4.0, -5.0, -6.0], [-7.0, -2.0, -9.0]]
-    assert (mesh.vertices == expected_vertices).all()
\ No newline at end of file
+    assert (mesh.vertices == expected_vertices).all()
+
+def test_quad_and_ngon():
+    f = io.StringIO("""v 0.0 0.0 0.0
+v 1.0 0.0 0.0
+v 1.0 1.0 0.0
+v 0.0 1.0 0.0
+v -1.0 0.5 0.0
+f 1 2 3 4
+f 1 4 5
+f 1//1 2//1 3//1 4//1 5//1 # pentagon
+""")
+    mesh = read_obj(f)
+    assert mesh.faces.shape == (6, 3)
+    assert (mesh.faces == [[0, 1, 2], [0, 2, 3], [0, 3, 4],
+                           [0, 1, 2], [0, 2, 3], [0, 3, 4]]).all()
+
+
+def test_negative_indices():
+    f = io.StringIO("""v 0.0 0.0 0.0
+v 1.0 0.0 0.0
+v 0.0 1.0 0.0
+f -3/-3 -2/-2 -1/-1
+v 0.0 0.0 1.0
+f -4 -3 -1
+f 1 -2 4
+""")
+    mesh = read_obj(f)
+    assert (mesh.faces == [[0, 1, 2], [0, 1, 3], [0, 2, 3]]).all()
+
+
+def test_vertex_normals_and_textures():
+    f = io.StringIO("""v 0.0 0.0 0.0 1.0
+vt 0.0 0.0
+vn 0.0 0.0 1.0
+v 1.0 0.0 0.0 1.0
+vt 1.0 0.0
+v 0.0 1.0 0.0 1.0
+vt 0.0 1.0
+f 1/1/1 2/2/1 3/3/1
+""")
+    mesh = read_obj(f)
+    assert mesh.vertices.shape == (3, 3)
+    assert (mesh.faces == [[0, 1, 2]]).all()
+
+
+def test_zero_index():
+    f = io.StringIO("v 0.0 0.0 0.0\nv 1.0 0.0 0.0\nv 0.0 1.0 0.0\nf 0 1 2\n")
+    with pytest.raises(RuntimeError, match="cannot be 0"):
+        read_obj(f)
+
+
+def test_vertex_coordinates():
+    # optional w coordinate and tabs
+    f = io.StringIO("v 0 0 0 1\nv\t1e0\t0 0\n  v 0 1.5 -0\nf 1 2 3\n")
+    mesh = read_obj(f)
+    assert np.array_equal(mesh.vertices, [[0, 0, 0], [1, 0, 0], [0, 1.5, 0]])
+    f = io.StringIO("v 0 0 0\nv 1 x 0\nv 0 1 0\nf 1 2 3\n")
+    with pytest.raises(RuntimeError, match="vertex coordinate"):
+        read_obj(f)
+
+
+def test_write_obj():
+    m = uv_sphere(16)
+    m.vertices /= 3
+    f = io.StringIO()
+    write_obj(m, f)
+    f.seek(0)
+    m2 = read_obj(f)
+    assert np.array_equal(m.vertices, m2.vertices)
+    assert np.array_equal(m.faces, m2.faces)
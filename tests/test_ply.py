@@ -0,0 +1,92 @@
+import io
+import struct
+
+import numpy as np
+import pytest
+
+from py3do import cube, uv_sphere
+from py3do.io import read_ply, write_ply, read_mesh
+
+
+@pytest.mark.parametrize("binary", [True, False])
+def test_roundtrip(binary):
+    m = uv_sphere(16)
+    f = io.BytesIO()
+    write_ply(m, f, binary=binary)
+    f.seek(0)
+    m2 = read_ply(f)
+    assert np.array_equal(m.vertices, m2.vertices)
+    assert np.array_equal(m.faces, m2.faces)
+
+
+def test_binary_size():
+    m = cube()
+    f = io.BytesIO()
+    write_ply(m, f)
+    header_len = f.getvalue().index(b"end_header\n") + len(b"end_header\n")
+    assert len(f.getvalue()) == header_len + 8 * 24 + 12 * 13
+
+
+def test_ascii_polygons():
+    f = io.BytesIO(b"""ply
+format ascii 1.0
+comment a square and a triangle
+element vertex 5
+property float x
+property float y
+property float z
+property uchar red
+element face 2
+property list uchar int vertex_indices
+end_header
+0 0 0 255
+1 0 0 255
+1 1 0 255
+0 1 0 255
+0 0 1 255
+4 0 1 2 3
+3 0 1 4
+""")
+    m = read_ply(f)
+    assert m.vertices.shape == (5, 3)
+    assert (m.faces == [[0, 1, 2], [0, 2, 3], [0, 1, 4]]).all()
+
+
+def _binary_ply(fmt, bo, faces):
+    header = ("ply\nformat " + fmt + " 1.0\n"
+              "element vertex 5\n"
+              "property float x\nproperty float y\nproperty float z\n"
+              "element face " + str(len(faces)) + "\n"
+              "property list uchar uint vertex_indices\n"
+              "property uchar flags\n"
+              "end_header\n").encode()
+    vertices = np.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0], [0, 0, 1]],
+                        dtype=bo + "f4")
+    body = vertices.tobytes()
+    for f in faces:
+        body += struct.pack(bo + "B" + "I" * len(f) + "B", len(f), *f, 7)
+    return io.BytesIO(header + body)
+
+
+@pytest.mark.parametrize("fmt,bo", [("binary_little_endian", "<"),
+                                    ("binary_big_endian", ">")])
+def test_binary_polygons(fmt, bo):
+    m = read_ply(_binary_ply(fmt, bo, [[0, 1, 4], [1, 2, 4]]))
+    assert (m.faces == [[0, 1, 4], [1, 2, 4]]).all()
+    assert m.vertices[2].tolist() == [1, 1, 0]
+    m = read_ply(_binary_ply(fmt, bo, [[0, 1, 2, 3], [0, 1, 4]]))
+    assert (m.faces == [[0, 1, 2], [0, 2, 3], [0, 1, 4]]).all()
+
+
+def test_wrong_header():
+    with pytest.raises(RuntimeError, match="Wrong PLY header"):
+        read_ply(io.BytesIO(b"plx\n"))
+
+
+def test_read_mesh(tmp_path):
+    m = cube()
+    fname = tmp_path / "cube.ply"
+    write_ply(m, fname)
+    m2 = read_mesh(str(fname))
+    assert np.array_equal(m.vertices, m2.vertices)
+    assert np.array_equal(m.faces, m2.faces)
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from py3do import cube, uv_sphere
+from py3do.io import read_meshes, write_ply, write_binary_stl
+
+
+@pytest.mark.parametrize("executor", ["process", "thread"])
+def test_read_meshes(tmp_path, executor):
+    c = cube()
+    c.face_attrs = np.arange(12, dtype=np.uint16)
+    s = uv_sphere(16)
+    write_binary_stl(c, tmp_path / "cube.stl")
+    write_ply(s, tmp_path / "sphere.ply")
+    (tmp_path / "bad.stl").write_bytes(b"xx")
+    paths = [str(tmp_path / n) for n in ["sphere.ply", "bad.stl", "cube.stl"]]
+    res = read_meshes(paths, workers=2, executor=executor)
+    assert [r.path for r in res] == paths
+    assert np.array_equal(res[0].mesh.vertices, s.vertices)
+    assert np.array_equal(res[0].mesh.faces, s.faces)
+    assert res[0].error is None
+    assert res[1].mesh is None
+    assert isinstance(res[1].error, RuntimeError)
+    assert np.array_equal(res[2].mesh.face_attrs, c.face_attrs)
+    assert all(r.seconds >= 0 for r in res)
+
+
+def test_wrong_executor():
+    with pytest.raises(ValueError):
+        read_meshes([], executor="gpu")
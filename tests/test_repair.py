@@ -0,0 +1,97 @@
+import numpy as np
+from pytest import approx
+
+from py3do import Mesh, cube, uv_sphere
+from py3do import volume, EdgeToFaceMap
+from py3do import remove_degenerate_faces, remove_duplicate_faces
+from py3do import split_nonmanifold, orient_faces, repair_mesh
+
+def test_remove_faces():
+    c = cube()
+    m = Mesh(c.vertices, np.vstack([c.faces, [[0, 1, 1]], c.faces[[3]],
+                                    c.faces[[5],::-1]]),
+             np.vstack([c.normals, [[0, 0, 0]], c.normals[[3]],
+                        -c.normals[[5]]]),
+             face_attrs=np.arange(15))
+    m1, removed = remove_degenerate_faces(m)
+    assert list(removed) == [12]
+    m2, removed = remove_duplicate_faces(m1)
+    assert list(removed) == [12, 13]
+    assert np.array_equal(m2.faces, c.faces)
+    assert np.array_equal(m2.face_attrs, np.arange(12))
+    assert np.array_equal(m2.vertices, m.vertices)
+    m2.vertices *= 2
+    assert np.array_equal(m.vertices, c.vertices)
+
+def test_split_nonmanifold():
+    # two cubes sharing an edge
+    c = cube()
+    c2 = cube()
+    c2.vertices += [1, 1, 0]
+    v = np.vstack([c.vertices, c2.vertices])
+    f = np.vstack([c.faces, c2.faces + 8])
+    m = Mesh(v, f)
+    m.merge_vertices()
+    assert not m.edge_to_face_map.manifold
+    m2, vertex_map = split_nonmanifold(m)
+    assert m2.vertices.shape[0] == m.vertices.shape[0] + 2
+    assert np.array_equal(m2.vertices, m.vertices[vertex_map])
+    efm = m2.edge_to_face_map
+    assert efm.manifold and efm.watertight and efm.oriented
+    assert volume(m2) == approx(2)
+    # manifold meshes are unchanged
+    s = uv_sphere(8)
+    s2, vertex_map = split_nonmanifold(s)
+    assert np.array_equal(s2.faces, s.faces)
+    assert np.array_equal(vertex_map, np.arange(s.vertices.shape[0]))
+
+def test_split_fin():
+    # triangle attached to an edge of a closed cube
+    c = cube()
+    m = Mesh(np.vstack([c.vertices, [[-1, -1, 0.5]]]),
+             np.vstack([c.faces, [[0, 1, 8]]]))
+    assert not m.edge_to_face_map.manifold
+    m2, vertex_map = split_nonmanifold(m)
+    assert np.array_equal(vertex_map, [0, 1, 2, 3, 4, 5, 6, 7, 8, 0, 1])
+    assert np.array_equal(m2.faces[:12], c.faces)
+    assert np.array_equal(m2.faces[12], [9, 10, 8])
+    efm = m2.edge_to_face_map
+    assert efm.manifold and efm.oriented
+    assert efm.find_faces(0, 1)[(0, 1)] == [0, 4]
+    assert efm.get_boundary_edges().shape[0] == 3
+
+def test_orient_faces():
+    m = uv_sphere(16)
+    rng = np.random.default_rng(0)
+    flip = rng.random(m.faces.shape[0]) < 0.5
+    bad = m.clone()
+    bad.faces[flip] = bad.faces[flip][:,::-1]
+    bad.normals[flip] *= -1
+    bad.invalidate()
+    assert not bad.edge_to_face_map.oriented
+    m2, flipped = orient_faces(bad)
+    assert np.array_equal(flipped, flip)
+    assert np.array_equal(m2.faces, m.faces)
+    assert np.allclose(m2.normals, m.normals)
+    # inside out sphere is turned outwards
+    inv = m.clone()
+    inv.faces = inv.faces[:,::-1]
+    m3, flipped = orient_faces(inv)
+    assert flipped.all() and volume(m3) == approx(volume(m))
+    assert not orient_faces(inv, outward=False)[1].any()
+
+def test_repair_mesh():
+    c = cube()
+    c2 = cube()
+    c2.vertices += [1, 1, 0]
+    m = Mesh(np.vstack([c.vertices, c2.vertices]),
+             np.vstack([c.faces, c2.faces[:,::-1] + 8, c.faces[:2]]))
+    m.merge_vertices()
+    m.faces = np.vstack([m.faces, [[0, 0, 1]]])
+    m.normals = np.vstack([m.normals, [[0, 0, 0]]])
+    m2, report = repair_mesh(m)
+    assert report == {"degenerate_faces": 1, "duplicate_faces": 2,
+                      "split_vertices": 2, "flipped_faces": 12,
+                      "manifold": True, "oriented": True,
+                      "watertight": True}
+    assert volume(m2) == approx(2)
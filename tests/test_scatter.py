@@ -0,0 +1,39 @@
+import numpy as np
+
+from py3do import Mesh, uv_sphere, vertex_normals
+from py3do.utils import scatter_add, scatter_min, renumber_by_first
+
+def test_scatter_add():
+    rng = np.random.default_rng(0)
+    idx = rng.integers(0, 10, 100)
+    values = rng.random((100, 3))
+    ref = np.zeros((12, 3))
+    np.add.at(ref, idx, values)
+    assert np.allclose(scatter_add(idx, values, 12), ref)
+    assert np.allclose(scatter_add(idx, values[:,0], 12), ref[:,0])
+    v32 = values.astype(np.float32)
+    assert scatter_add(idx, v32, 12).dtype == np.float32
+
+def test_scatter_min():
+    rng = np.random.default_rng(0)
+    idx = rng.integers(0, 10, (30, 3))
+    values = rng.random((30, 3))
+    ref = np.full(12, 5.0)
+    np.minimum.at(ref, idx.ravel(), values.ravel())
+    assert np.array_equal(scatter_min(idx, values, 12, 5.0), ref)
+    assert np.array_equal(scatter_min([], np.empty(0), 2, 1.0), [1, 1])
+
+def test_renumber_by_first():
+    labels, first = renumber_by_first([3, 1, 3, 0, 1], 5)
+    assert list(labels) == [0, 1, 0, 2, 1]
+    assert list(first[:3]) == [0, 1, 3]
+    assert list(first[3:]) == [5, 5]
+
+def test_vertex_normals_float32():
+    m = uv_sphere(16)
+    m32 = Mesh(m.vertices, m.faces, dtype=np.float32)
+    for method in ["average", "area weighted", "angle weighted"]:
+        vn = vertex_normals(m32, method, normalize=False)
+        assert vn.dtype == np.float32
+        assert np.allclose(vn, vertex_normals(m, method, normalize=False),
+                           atol=1e-5)
@@ -1,9 +1,14 @@
 import io
+import struct
 
+import numpy as np
 import pytest
 
 from py3do.io import read_ascii_stl, write_ascii_stl
 from py3do.io import read_binary_stl, write_binary_stl
+from py3do.io import read_stl, map_binary_stl
+from py3do.io.stl import _facet_dtype
+from py3do.io.stl import _parse_ascii_stl_fast, _read_ascii_stl_strict
 from py3do import is_isomorphic
 
 
@@ -179,3 +184,94 @@ def test_cube_write_binary():
     fo.seek(0)
     cube2 = read_binary_stl(fo)
     assert is_isomorphic(cube, cube2)
+
+def _weld_with_dict(vs):
+    """Reference welding of a triangle soup using a Python dict."""
+    vertex_map = {}
+    faces = [[vertex_map.setdefault(tuple(v), len(vertex_map)) for v in fv]
+             for fv in vs.tolist()]
+    return np.array(list(vertex_map.keys())), np.array(faces)
+
+def test_binary_stl_vertex_order():
+    rng = np.random.default_rng(0)
+    # few distinct coordinates to get many repeated vertices
+    coords = np.array([-1.5, -0.0, 0.0, 0.25, 3.0], dtype=np.float32)
+    vs = rng.choice(coords, size=(200, 3, 3))
+    normals = rng.random((200, 3)).astype(np.float32)
+    d = np.zeros(200, dtype=_facet_dtype)
+    d["normal"] = normals
+    d["v"] = vs
+    f = io.BytesIO(b" " * 80 + struct.pack("<L", 200) + d.tobytes())
+    m = read_binary_stl(f)
+    ref_vertices, ref_faces = _weld_with_dict(vs)
+    assert np.array_equal(m.vertices, ref_vertices)
+    assert np.array_equal(m.faces, ref_faces)
+    assert np.array_equal(m.normals, normals)
+
+def test_binary_stl_truncated():
+    f = io.BytesIO(b" " * 80 + struct.pack("<L", 2) + b"\0" * 50)
+    with pytest.raises(RuntimeError, match="Unexpected end of file"):
+        read_binary_stl(f)
+
+def test_binary_stl_mmap(tmp_path):
+    f = io.StringIO(cube_stl)
+    cube = read_ascii_stl(f)
+    fname = tmp_path / "cube.stl"
+    write_binary_stl(cube, fname)
+    d = map_binary_stl(fname)
+    assert d.shape == (12,)
+    assert np.array_equal(d["v"], cube.vertices[cube.faces])
+    del d
+    cube2 = read_stl(fname, mmap=True)
+    cube3 = read_binary_stl(fname)
+    assert np.array_equal(cube2.vertices, cube3.vertices)
+    assert np.array_equal(cube2.faces, cube3.faces)
+    assert np.array_equal(cube2.normals, cube3.normals)
+    with open(fname, "ab") as fo:
+        fo.write(b"\0")
+    with pytest.raises(RuntimeError, match="Expected end of file"):
+        read_binary_stl(fname, mmap=True)
+
+@pytest.mark.parametrize("chunk_faces", [None, 1, 5, 100])
+def test_binary_stl_write_chunks(chunk_faces):
+    f = io.StringIO(cube_stl)
+    cube = read_ascii_stl(f)
+    cube.face_attrs = np.arange(12, dtype=np.uint16)
+    fo = io.BytesIO(b"")
+    write_binary_stl(cube, fo, chunk_faces=chunk_faces)
+    b = fo.getvalue()
+    assert len(b) == 84 + 50 * 12
+    d = np.frombuffer(b[84:], dtype=_facet_dtype)
+    assert np.array_equal(d["v"], cube.vertices[cube.faces])
+    assert np.array_equal(d["normal"], cube.normals)
+    assert np.array_equal(d["attr"], np.arange(12))
+    fo.seek(0)
+    cube2 = read_binary_stl(fo)
+    assert np.array_equal(cube2.face_attrs, np.arange(12))
+
+def test_ascii_fast_matches_strict():
+    indented = "\n".join("  " + l for l in cube_stl.split("\n"))
+    for text in [cube_stl, indented.strip() + "\n", cube_stl.replace("\n", "\r\n")]:
+        normals, fvs = _parse_ascii_stl_fast(text)
+        vertices, faces, normals2 = _read_ascii_stl_strict(io.StringIO(text))
+        m = read_ascii_stl(io.StringIO(text))
+        assert np.array_equal(m.vertices, vertices)
+        assert np.array_equal(m.faces, faces)
+        assert np.array_equal(m.normals, normals2)
+        assert np.array_equal(normals, normals2)
+
+def test_ascii_bad_number():
+    f = io.StringIO(cube_stl.replace("vertex 10.0 0.0 10.0", "vertex 10.0 x 10.0"))
+    with pytest.raises(ValueError):
+        read_ascii_stl(f)
+    f = io.StringIO(cube_stl + "solid\n")
+    with pytest.raises(RuntimeError, match="Content after 'endsolid'"):
+        read_ascii_stl(f)
+
+def test_ascii_write_format():
+    f = io.StringIO(cube_stl)
+    cube = read_ascii_stl(f)
+    fo = io.StringIO("")
+    write_ascii_stl(cube, fo, model_name="cube", float_fmt="%.1f", indent=0,
+                    chunk_faces=5)
+    assert fo.getvalue() == cube_stl.strip()
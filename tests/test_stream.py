@@ -0,0 +1,56 @@
+import io
+
+import numpy as np
+import pytest
+from pytest import approx
+
+from py3do import uv_sphere, volume, COG, normals_cross
+from py3do import stream_volume, stream_COG, stream_extents
+from py3do import stream_surface_area
+from py3do.io import iter_stl_chunks, write_ascii_stl, write_binary_stl
+
+def _sphere():
+    m = uv_sphere(16)
+    m.vertices += [[1, 2, 3]]
+    return m
+
+def _binary(m):
+    f = io.BytesIO()
+    write_binary_stl(m, f)
+    f.seek(0)
+    return f
+def _ascii(m):
+    f = io.StringIO()
+    write_ascii_stl(m, f)
+    f.seek(0)
+    return f
+
+@pytest.mark.parametrize("to_file", [_binary, _ascii])
+@pytest.mark.parametrize("chunk_faces", [1, 7, 10**6])
+def test_iter_stl_chunks(to_file, chunk_faces):
+    m = _sphere()
+    chunks = list(iter_stl_chunks(to_file(m), chunk_faces=chunk_faces))
+    assert all(len(n) == chunk_faces for n, _ in chunks[:-1])
+    normals = np.vstack([n for n, _ in chunks])
+    fvs = np.vstack([v for _, v in chunks])
+    assert fvs.shape == (m.faces.shape[0], 3, 3)
+    assert np.allclose(normals, m.normals, atol=1e-6)
+    assert np.allclose(fvs, m.vertices[m.faces], atol=1e-6)
+
+def test_iter_stl_chunks_file(tmp_path):
+    m = _sphere()
+    fname = tmp_path / "sphere.stl"
+    with open(fname, "w") as f:
+        write_ascii_stl(m, f)
+    n = sum(len(fvs) for _, fvs in iter_stl_chunks(fname, chunk_faces=10))
+    assert n == m.faces.shape[0]
+
+def test_stream_reductions():
+    m = _sphere()
+    assert stream_volume(iter_stl_chunks(_binary(m), 100)) == approx(volume(m))
+    assert np.allclose(stream_COG(iter_stl_chunks(_binary(m), 100)), COG(m))
+    assert np.allclose(stream_extents(iter_stl_chunks(_binary(m), 100)),
+                       m.extents())
+    _, areas = normals_cross(m)
+    assert stream_surface_area(iter_stl_chunks(_binary(m), 100)) ==\
+        approx(areas.sum())
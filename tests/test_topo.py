@@ -89,6 +89,27 @@ def test_edge_face_map4():
     f = efm.find_faces([[0,3], [1,3]])
     assert len(f) == 2
 
+def test_find_faces_arrays():
+    c = cube()
+    c.faces = np.vstack([c.faces, [[1,3,6]]])
+    efm = EdgeToFaceMap(c)
+    # reversed edge, missing edge (0, 7) and edge with 3 faces
+    edges = [[3,0], [0,7], [1,3]]
+    counts, faces = efm.find_faces(edges, return_type="array")
+    assert np.array_equal(counts, [2, 0, 3])
+    assert sorted(faces[:2]) == [0, 1]
+    assert sorted(faces[2:]) == [0, 10, 12]
+    indptr, faces2 = efm.find_faces([3,0,1], [0,7,3], return_type="csr")
+    assert np.array_equal(indptr, [0, 2, 2, 5])
+    assert np.array_equal(faces, faces2)
+    f = efm.find_faces(edges)
+    assert f[(0,7)] == []
+    assert sorted(f[(0,3)]) == [0, 1]
+    counts, _ = efm.find_faces(np.column_stack([efm.unique_edges["i"],
+                                                efm.unique_edges["j"]]),
+                               return_type="array")
+    assert np.array_equal(counts, efm.face_counts)
+
 def test_sorted_edges_basic():
     """Test sorted_edges with a simple cube."""
     m = cube()
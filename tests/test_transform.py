@@ -0,0 +1,46 @@
+import numpy as np
+from pytest import approx
+
+from py3do import cube, uv_sphere
+from py3do import normals_cross, transform_points, volume
+from py3do import EdgeToFaceMap
+
+def _rot_z(a, t=(0, 0, 0)):
+    T = np.eye(4)
+    T[:2,:2] = [[np.cos(a), -np.sin(a)], [np.sin(a), np.cos(a)]]
+    T[:3,3] = t
+    return T
+
+def test_transform():
+    m = uv_sphere(16)
+    v = m.vertices.copy()
+    T = _rot_z(0.3, (1, 2, 3))
+    m.transform(T)
+    assert np.allclose(m.vertices, v @ T[:3,:3].T + [1, 2, 3])
+    assert np.allclose(m.normals, normals_cross(m)[0])
+    # non uniform scaling
+    S = np.diag([1, 2, 3])
+    m2 = m.transform(np.column_stack([S, np.zeros(3)]), inplace=False)
+    assert np.allclose(m2.normals, normals_cross(m2)[0])
+    assert np.allclose(m.vertices, v @ T[:3,:3].T + [1, 2, 3])
+
+def test_transform_mirror():
+    m = cube()
+    m.transform(np.diag([-1, 1, 1, 1]))
+    assert volume(m) == approx(1)
+    assert np.allclose(m.normals, normals_cross(m)[0])
+    assert EdgeToFaceMap(m).oriented
+
+def test_rot90_normals():
+    m = cube()
+    m.rot90("XYz")
+    assert np.array_equal(m.normals, normals_cross(m)[0])
+
+def test_transform_batch():
+    m = cube()
+    Ts = np.stack([_rot_z(a, (a, 0, 0)) for a in np.linspace(0, 1, 5)])
+    vs = m.transform_batch(Ts)
+    assert vs.shape == (5, 8, 3)
+    for T, v in zip(Ts, vs):
+        assert np.allclose(v, m.transform(T, inplace=False).vertices)
+    assert np.allclose(transform_points(m.vertices, Ts[2][:3]), vs[2])
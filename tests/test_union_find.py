@@ -20,3 +20,42 @@ def test_union_find():
     se = uf.set_elements()
     assert len(se) == 2
     assert np.array_equal(uf.sets(), [0,0,0,1,0])
+
+def test_union_many():
+    rng = np.random.default_rng(0)
+    n = 1000
+    i = rng.integers(0, n, 700)
+    j = rng.integers(0, n, 700)
+    uf1 = UnionFind(n)
+    for a, b in zip(i, j):
+        uf1.union(a, b)
+    uf2 = UnionFind(n)
+    uf2.union_many(i, j)
+    assert uf1.n == uf2.n
+    assert np.array_equal(uf1.sets(), uf2.sets())
+    roots = uf2.find(np.arange(n))
+    assert np.array_equal(np.bincount(roots, minlength=n)[roots],
+                          uf2.sizes[roots])
+
+def test_long_chain():
+    n = 100000
+    uf = UnionFind(n)
+    uf.parents[1:] = np.arange(n - 1)  # worst case chain
+    assert uf.find(n - 1) == 0
+    uf = UnionFind(n)
+    uf.parents[1:] = np.arange(n - 1)
+    assert uf._find_scalar(n - 1) == 0
+    uf = UnionFind(n)
+    uf.union_many(np.arange(n - 1), np.arange(1, n))
+    assert uf.n == 1
+    assert uf.sizes[uf.find(0)] == n
+
+def test_find_touches_queried_only():
+    n = 10
+    uf = UnionFind(n)
+    uf.parents[1:] = np.arange(n - 1)
+    assert list(uf.find(np.array([5, 3]))) == [0, 0]
+    expected = np.arange(-1, n - 1)
+    expected[[0, 3, 5]] = 0
+    assert np.array_equal(uf.parents, expected)
+    assert isinstance(uf.find(9), (int, np.integer))